@@ -0,0 +1,372 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import warnings
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import hostel_app
+
+# Headless benchmarks for the hostel app: loading the roster and logs, saving
+# an incident, the sanction computation, Word reports and the GitHub push, on
+# seeded synthetic data in the app's own CSV schemas. Results go to a JSON
+# file; pass an earlier one as --baseline to flag regressions.
+#
+#   python benchmark.py                         # 1k, 10k and 100k rows
+#   python benchmark.py --sizes 1000 --repeat 5 --output before.json
+#   python benchmark.py --baseline before.json  # exits 1 on a regression
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_OUTPUT = "benchmark_results.json"
+
+SYLLABLES = ["ab", "ba", "de", "di", "el", "fa", "ge", "ha", "jo", "ka", "le", "ma", "ne", "no",
+             "pi", "ra", "ri", "sa", "se", "ta", "te", "vi", "wa", "ze"]
+TEACHERS = ["A VISAGIE", "D GROENEWALD", "E PHILLIPS", "J MAREE", "L NEL", "M JACOBS", "R DAMON", "S PIETERS"]
+INCIDENTS = ["Laat by studiesaal(Oggend)", "Laat by studiesaal(Middag)", "Laat by studiesaal(5 uur)",
+             "Selfoon in studiesaal", "Kamer deurmekaar", "Uit bed na ligte af", "Ongemagtig van koshuis af",
+             "Rook op perseel", "Baklei", "Disrespek teenoor personeel"]
+EVENTS = ["Siek, na hostel gestuur", "Ouers kom haal vir naweek", "Na dokter geneem", "Besoek van ouers",
+          "Sportbesering", "Laat terug van huis", "Kamer verskuif"]
+COMMENT_WORDS = ["leerder", "kom", "laat", "by", "die", "hek", "studiesaal", "weer", "gepraat", "met",
+                 "ouers", "gebel", "selfoon", "afgeneem", "kamer", "nie", "skoon", "gereeld", "toesig",
+                 "hou", "waarskuwing", "gegee", "aand", "oggend", "naweek"]
+CATEGORY_WEIGHTS = [0.55, 0.25, 0.15, 0.05]
+
+# Word made of `count` random syllables
+def _words(rng, size, count):
+    picks = rng.integers(0, len(SYLLABLES), size=(size, count))
+    return ["".join(SYLLABLES[i] for i in row) for row in picks]
+
+def _comments(rng, size, low=6, high=20):
+    lengths = rng.integers(low, high, size=size)
+    words = rng.choice(COMMENT_WORDS, size=lengths.sum())
+    ends = np.cumsum(lengths)
+    return [" ".join(words[end - length:end]).capitalize() + "." for end, length in zip(ends, lengths)]
+
+# Roster with `size` unique learners in learner_list.csv's columns
+def synthetic_roster(rng, size):
+    blocks = [f"{letter} {surname.upper()}" for letter, surname in zip("ABCDEFGH", _words(rng, 8, 3))]
+    names = set()
+    while len(names) < size:
+        need = size - len(names)
+        names.update(zip([s.upper() for s in _words(rng, need, 3)], [f.capitalize() for f in _words(rng, need, 2)]))
+    surnames, firsts = zip(*sorted(names))
+    return pd.DataFrame({
+        'Leerder van': surnames,
+        'Leerner se naam': firsts,
+        'Geslag': rng.choice(["M", "V"], size=size),
+        'BLOK': rng.choice(blocks, size=size),
+        'Opvoeder betrokke': rng.choice(TEACHERS, size=size),
+        'Wat het gebeur': rng.choice(INCIDENTS, size=size),
+        'Kategorie': rng.choice(["1", "2", "3", "4"], size=size, p=CATEGORY_WEIGHTS),
+    })
+
+# Learners for `size` log rows, skewed so a few learners have many entries
+def _log_learners(rng, roster, size):
+    weights = 1.0 / np.arange(1, len(roster) + 1) ** 1.1
+    picks = rng.choice(len(roster), size=size, p=weights / weights.sum())
+    learners = roster.iloc[rng.permutation(len(roster))].iloc[picks]
+    return (learners['Leerder van'] + ' ' + learners['Leerner se naam']).to_numpy(), learners['BLOK'].to_numpy()
+
+# Dates over the year up to today, oldest first, as the app writes them
+def _log_dates(rng, size, today):
+    offsets = np.sort(rng.integers(0, 365, size=size))[::-1]
+    return [(today - timedelta(days=int(days))).strftime("%Y-%m-%d") for days in offsets]
+
+def _entry_ids(rng, size):
+    return [f"{value:016x}" for value in rng.integers(0, 2**63, size=size, dtype=np.int64)]
+
+def synthetic_incident_log(rng, roster, size, today):
+    learners, blocks = _log_learners(rng, roster, size)
+    return pd.DataFrame({
+        'Learner_Full_Name': learners,
+        'Block': blocks,
+        'Teacher': rng.choice(TEACHERS, size=size),
+        'Incident': rng.choice(INCIDENTS, size=size),
+        'Category': rng.choice(["1", "2", "3", "4"], size=size, p=CATEGORY_WEIGHTS),
+        'Comment': _comments(rng, size),
+        'Date': _log_dates(rng, size, today),
+        'Id': _entry_ids(rng, size),
+    })
+
+def synthetic_happenings_log(rng, roster, size, today):
+    learners, blocks = _log_learners(rng, roster, size)
+    return pd.DataFrame({
+        'Learner_Full_Name': learners,
+        'Block': blocks,
+        'Event': rng.choice(EVENTS, size=size),
+        'Comment': _comments(rng, size),
+        'Date': _log_dates(rng, size, today),
+        'Id': _entry_ids(rng, size),
+    })
+
+# Write the roster and both logs for one size into `directory`
+def write_synthetic_data(directory, size, seed, today=None):
+    rng = np.random.default_rng([seed, size])
+    today = today or date.today()
+    roster = synthetic_roster(rng, size)
+    roster.to_csv(os.path.join(directory, "learner_list.csv"), index=False)
+    synthetic_incident_log(rng, roster, size, today).to_csv(os.path.join(directory, "incident_log.csv"), index=False)
+    synthetic_happenings_log(rng, roster, size, today).to_csv(os.path.join(directory, "happenings_log.csv"), index=False)
+    return roster
+
+# Stands in for GithubRepoClient: keeps pushed files in memory and counts calls
+class StubGithubClient:
+    def __init__(self):
+        self.configured = True
+        self.lock = threading.RLock()
+        self.files = {}
+        self.calls = {}
+
+    def _count(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def get_file(self, path):
+        self._count('get_file')
+        content = self.files.get(path)
+        return content.decode('utf-8') if isinstance(content, bytes) else content
+
+    def get_files(self, paths):
+        self._count('get_files')
+        return {path: self._bytes(self.files.get(path)) for path in paths}
+
+    @staticmethod
+    def _bytes(content):
+        return content.encode('utf-8') if isinstance(content, str) else content
+
+    def list_dir(self, path):
+        self._count('list_dir')
+        prefix = path.rstrip("/") + "/"
+        files = [name for name in self.files if name.startswith(prefix) and "/" not in name[len(prefix):]]
+        return sorted(files) or None
+
+    def known_sha(self, path):
+        self._count('known_sha')
+        return None
+
+    def put_file(self, path, content, message, sha):
+        self._count('put_file')
+        # Kept as pushed: archived partitions are gzip bytes
+        self.files[path] = content
+
+    def delete_file(self, path, message):
+        self._count('delete_file')
+        self.files.pop(path, None)
+
+    def poll_file(self, path, etag=None):
+        self._count('poll_file')
+        return etag, None, None
+
+    def remember_sha(self, path, sha):
+        pass
+
+# The app module with GitHub replaced by `client`. Cached resources are
+# dropped so each size gets its own roster, stores and sync worker.
+def load_app(client):
+    hostel_app.st.cache_resource.clear()
+    hostel_app.get_github_client = lambda: client
+    # Pushes happen only when the github_sync benchmark flushes the outbox
+    hostel_app.SYNC_DEBOUNCE_SECONDS = hostel_app.SYNC_MAX_DELAY_SECONDS = 10**9
+    return hostel_app
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+# Time `run` `repeat` times (after `setup`, untimed), then once more under
+# tracemalloc for the peak of Python-tracked memory
+def measure(name, size, run, setup=None, repeat=3):
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - started)
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    result = {
+        'name': name,
+        'rows': size,
+        'runs_s': [round(t, 6) for t in times],
+        'median_s': round(statistics.median(times), 6),
+        'min_s': round(min(times), 6),
+        'peak_mib': round(peak / 2**20, 3),
+    }
+    print(f"{name:<36} {size:>8} rows  median {result['median_s']:>10.4f}s  min {result['min_s']:>10.4f}s  peak {result['peak_mib']:>9.2f} MiB", flush=True)
+    return result
+
+# All benchmarks for one size, each in a fresh copy of the synthetic data
+def run_size(size, seed, repeat, only=None):
+    results = []
+    client = StubGithubClient()
+    with tempfile.TemporaryDirectory(prefix=f"hostel-bench-{size}-") as directory:
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            roster = write_synthetic_data(directory, size, seed)
+            app = load_app(client)
+            # Library imports are measured by the app's startup timer, not here
+            app.load_charting()
+            __import__("docx")
+            learner = (roster['Leerder van'] + ' ' + roster['Leerner se naam']).iloc[0]
+            block, teacher, incident = roster[['BLOK', 'Opvoeder betrokke', 'Wat het gebeur']].iloc[0]
+
+            def fresh_learner_data(snapshot):
+                app.load_learner_data.clear()
+                app.get_roster_options.clear()
+                if not snapshot:
+                    _remove(app._snapshot_path("learner_list.csv"))
+
+            def fresh_stores(snapshot):
+                app.get_log_stores.clear()
+                app.get_sanction_engine.clear()
+                if not snapshot:
+                    for path in ("incident_log.csv", "happenings_log.csv"):
+                        _remove(app._snapshot_path(path))
+
+            # New stores too: a cleared engine would stay subscribed to the old
+            # store and keep being updated by every later save
+            def fresh_sanctions():
+                fresh_stores(True)
+                app.load_incident_log()
+
+            def save():
+                app.save_incident([learner], block, teacher, incident, '2', "Benchmark inskrywing")
+
+            def flush_outbox():
+                worker = app.get_sync_worker()
+                worker._flush(worker._read_outbox())
+
+            def most_active_learner_report():
+                df = app.load_incident_log()
+                name = df['Learner_Full_Name'].value_counts().index[0]
+                store = app.get_log_stores()
+                app.generate_word_report(store['incident'].rows_for_learner(name), store['happenings'].rows_for_learner(name), name)
+
+            benchmarks = [
+                ("load_learner_data[csv]", app.load_learner_data, lambda: fresh_learner_data(False)),
+                ("load_learner_data[snapshot]", app.load_learner_data, lambda: fresh_learner_data(True)),
+                ("load_incident_log[csv]", app.load_incident_log, lambda: fresh_stores(False)),
+                ("load_incident_log[snapshot]", app.load_incident_log, lambda: fresh_stores(True)),
+                ("load_incident_log[cached]", app.load_incident_log, None),
+                ("save_incident", save, None),
+                ("compute_sanctions[full]", app.compute_sanctions, fresh_sanctions),
+                ("compute_sanctions[after_save]", app.compute_sanctions, save),
+                ("generate_word_report[learner]", most_active_learner_report, None),
+                ("generate_word_report[full]", lambda: app.generate_word_report(app.load_incident_log(), app.load_happenings_log()), None),
+                ("github_sync", flush_outbox, save),
+            ]
+            for name, run, setup in benchmarks:
+                if only and not any(name.startswith(prefix) for prefix in only):
+                    continue
+                results.append(measure(name, size, run, setup, repeat))
+        finally:
+            os.chdir(cwd)
+    return results, client.calls
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=APP_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _versions():
+    versions = {'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__}
+    for module in ("streamlit", "docx", "matplotlib", "pyarrow"):
+        try:
+            versions[module] = getattr(__import__(module), "__version__", None)
+        except ImportError:
+            versions[module] = None
+    return versions
+
+# Benchmarks whose median grew by more than `tolerance` times the baseline's
+def find_regressions(results, baseline, tolerance):
+    previous = {(r['name'], r['rows']): r for r in baseline['results']}
+    regressions = []
+    for result in results:
+        before = previous.get((result['name'], result['rows']))
+        if before and before['median_s'] > 0 and result['median_s'] > before['median_s'] * tolerance:
+            regressions.append({
+                'name': result['name'],
+                'rows': result['rows'],
+                'baseline_s': before['median_s'],
+                'median_s': result['median_s'],
+                'ratio': round(result['median_s'] / before['median_s'], 3),
+            })
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the hostel app on synthetic data.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="rows per roster and log")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per benchmark")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--backend", choices=["csv", "sqlite", "partitioned"], default="csv", help="STORAGE_BACKEND to benchmark")
+    parser.add_argument("--only", nargs="+", help="run only benchmarks whose name starts with one of these")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSON results file")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="slowdown ratio counted as a regression")
+    args = parser.parse_args(argv)
+
+    os.environ["STORAGE_BACKEND"] = args.backend
+    logging.basicConfig(level=logging.WARNING)
+    logging.disable(logging.WARNING)  # the app's own logging and Streamlit's bare-mode notices
+    warnings.simplefilter("ignore", FutureWarning)
+
+    results, github_calls = [], {}
+    for size in args.sizes:
+        size_results, calls = run_size(size, args.seed, args.repeat, args.only)
+        results.extend(size_results)
+        for name, count in calls.items():
+            github_calls[name] = github_calls.get(name, 0) + count
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'backend': args.backend,
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'versions': _versions(),
+        'github_stub_calls': github_calls,
+        'results': results,
+    }
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = find_regressions(results, json.load(f), args.tolerance)
+        report['baseline'] = args.baseline
+        report['regressions'] = regressions
+        for regression in regressions:
+            print(f"REGRESSION {regression['name']} ({regression['rows']} rows): "
+                  f"{regression['baseline_s']:.4f}s -> {regression['median_s']:.4f}s (x{regression['ratio']})")
+        exit_code = 1 if regressions else 0
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
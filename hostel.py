@@ -1,35 +1,34 @@
+import time
+_SCRIPT_STARTED = time.perf_counter()
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 from datetime import datetime
 import pytz
-from docx import Document
-from docx.shared import Inches
 import io
-from matplotlib.ticker import MaxNLocator
 import logging
-from github import Github
-import base64
-import os
+import threading
+from contextlib import contextmanager
+from hostel_reports import bar_chart_png, load_charting
+from hostel_app import (
+    HEATMAP_WEEKS, RemoteLogUnavailable, TREND_DIMENSIONS, TREND_FREQUENCIES, UNDO_SECONDS,
+    build_bulk_reports, bulk_report_learners, clear_happening, clear_incident, compute_sanctions,
+    get_chart_cache, get_log_bootstrap, get_log_compactor, get_log_stores, get_remote_poller,
+    get_roster_options, get_sync_worker, heatmap_png, lazy_word_report, learner_filter_options,
+    load_happenings_log, load_incident_log, log_versions, save_happening, save_incident,
+    search_logs, trend_rollups, undo_last_clear,
+)
 
 # Configure logging for Streamlit Cloud logs (not UI)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Set seaborn style for professional charts
-sns.set_style("whitegrid")
-plt.rcParams['font.size'] = 10
-plt.rcParams['axes.titlesize'] = 12
-plt.rcParams['axes.labelsize'] = 10
-plt.rcParams['xtick.labelsize'] = 9
-plt.rcParams['ytick.labelsize'] = 9
-
-# Set page config
-st.set_page_config(page_title="Hostel Insident Verslag", layout="wide")
+# matplotlib/seaborn, python-docx and PyGithub are imported where they are
+# first needed (a chart, a report, a GitHub call), or by the startup
+# pre-warm, so they do not delay the first render
+_IMPORTS_DONE = time.perf_counter()
 
 # Custom CSS for futuristic and professional styling
-st.markdown("""
+PAGE_CSS = """
     <style>
         /* General layout */
         .stApp {
@@ -279,7 +278,7 @@ st.markdown("""
         }
 
         /* Charts */
-        .stPyplot {
+        .stPyplot, .stImage {
             border-radius: 12px;
             padding: 15px;
             background: rgba(15, 23, 42, 0.9);
@@ -363,684 +362,593 @@ st.markdown("""
         }
     </style>
     <link href="https://fonts.googleapis.com/css2?family=Orbitron:wght@400;500;700&display=swap" rel="stylesheet">
-""", unsafe_allow_html=True)
-
-# Load and preprocess learner data
-@st.cache_data
-def load_learner_data():
-    try:
-        df = pd.read_csv("learner_list.csv")
-        df.columns = df.columns.str.strip()
-        df['Learner_Full_Name'] = (df['Leerder van'].fillna('') + ' ' + df['Leerner se naam'].fillna('')).str.strip()
-        df = df.rename(columns={
-            'BLOK': 'Block',
-            'Opvoeder betrokke': 'Teacher',
-            'Wat het gebeur': 'Incident',
-            'Kategorie': 'Category'
-        })
-        df['Learner_Full_Name'] = df['Learner_Full_Name'].replace('', 'Onbekend2999')
-        df['Block'] = df['Block'].fillna('Onbekend2999')
-        df['Teacher'] = df['Teacher'].fillna('Onbekend2999')
-        df['Incident'] = df['Incident'].fillna('Onbekend2999')
-        df['Category'] = pd.to_numeric(df['Category'], errors='coerce').fillna(1).astype(int).astype(str)
-        return df[['Learner_Full_Name', 'Block', 'Teacher', 'Incident', 'Category']]
-    except FileNotFoundError:
-        logger.warning("learner_list.csv not found. Returning empty DataFrame.")
-        return pd.DataFrame(columns=['Learner_Full_Name', 'Block', 'Teacher', 'Incident', 'Category'])
-
-# Load or initialize incident log
-def load_incident_log():
-    try:
-        if os.path.exists("incident_log.csv") and os.path.getsize("incident_log.csv") > 0:
-            df = pd.read_csv("incident_log.csv")
-        else:
-            g = Github(st.secrets["GITHUB_TOKEN"])
-            repo = g.get_repo("arnoldtRealph/hostel")
-            try:
-                contents = repo.get_contents("incident_log.csv", ref="master")
-                content = base64.b64decode(contents.content).decode('utf-8')
-                df = pd.read_csv(io.StringIO(content))
-                df.to_csv("incident_log.csv", index=False)
-                logger.info("Incident log fetched from GitHub and saved locally")
-            except:
-                logger.warning("incident_log.csv does not exist in GitHub repository. Initializing empty DataFrame.")
-                df = pd.DataFrame(columns=['Learner_Full_Name', 'Block', 'Teacher', 'Incident', 'Category', 'Comment', 'Date'])
-
-        df.columns = df.columns.str.strip()
-        column_mapping = {
-            'BLOK': 'Block',
-            'Opvoeder betrokke': 'Teacher',
-            'Wat het gebeur': 'Incident',
-            'Kategorie': 'Category',
-            'Leerder Naam': 'Learner_Full_Name',
-            'Kommentaar': 'Comment',
-            'Datum': 'Date'
-        }
-        df = df.rename(columns=column_mapping)
-        expected_columns = ['Learner_Full_Name', 'Block', 'Teacher', 'Incident', 'Category', 'Comment', 'Date']
-        for col in expected_columns:
-            if col not in df.columns:
-                df[col] = 'Onbekend2999' if col != 'Date' else pd.NaT
-        df['Category'] = pd.to_numeric(df['Category'], errors='coerce').fillna(1).astype(int).astype(str)
-        df['Date'] = pd.to_datetime(df['Date'], errors='coerce').dt.date
-        return df[expected_columns]
-    except Exception as e:
-        logger.error(f"Error loading incident_log.csv: {e}")
-        return pd.DataFrame(columns=['Learner_Full_Name', 'Block', 'Teacher', 'Incident', 'Category', 'Comment', 'Date'])
-
-# Load or initialize general happenings log
-def load_happenings_log():
-    try:
-        if os.path.exists("happenings_log.csv") and os.path.getsize("happenings_log.csv") > 0:
-            df = pd.read_csv("happenings_log.csv")
-        else:
-            g = Github(st.secrets["GITHUB_TOKEN"])
-            repo = g.get_repo("arnoldtRealph/hostel")
-            try:
-                contents = repo.get_contents("happenings_log.csv", ref="master")
-                content = base64.b64decode(contents.content).decode('utf-8')
-                df = pd.read_csv(io.StringIO(content))
-                df.to_csv("happenings_log.csv", index=False)
-                logger.info("Happenings log fetched from GitHub and saved locally")
-            except:
-                logger.warning("happenings_log.csv does not exist in GitHub repository. Initializing empty DataFrame.")
-                df = pd.DataFrame(columns=['Learner_Full_Name', 'Block', 'Event', 'Comment', 'Date'])
+"""
 
-        df.columns = df.columns.str.strip()
-        column_mapping = {
-            'Leerder Naam': 'Learner_Full_Name',
-            'BLOK': 'Block',
-            'Gebeurtenis': 'Event',
-            'Kommentaar': 'Comment',
-            'Datum': 'Date'
-        }
-        df = df.rename(columns=column_mapping)
-        expected_columns = ['Learner_Full_Name', 'Block', 'Event', 'Comment', 'Date']
-        for col in expected_columns:
-            if col not in df.columns:
-                df[col] = 'Onbekend2999' if col != 'Date' else pd.NaT
-        df['Date'] = pd.to_datetime(df['Date'], errors='coerce').dt.date
-        return df[expected_columns]
-    except Exception as e:
-        logger.error(f"Error loading happenings_log.csv: {e}")
-        return pd.DataFrame(columns=['Learner_Full_Name', 'Block', 'Event', 'Comment', 'Date'])
-
-# Save incident to log
-def save_incident(learner_full_name, block, teacher, incident, category, comment):
-    if not all([learner_full_name != 'Kies', block != 'Kies', teacher != 'Kies', incident != 'Kies', category != 'Kies', comment]):
-        logger.warning("Incomplete incident fields, saving skipped.")
-        st.warning("Alle velde moet ingevul wees om die insident te stoor.")
-        return load_incident_log()
-        
-    incident_log = load_incident_log()
+# Show pending and last-synced GitHub state
+def render_sync_status():
+    status = get_sync_worker().status()
     sa_tz = pytz.timezone('Africa/Johannesburg')
-    new_incident = pd.DataFrame({
-        'Learner_Full_Name': [learner_full_name],
-        'Block': [block],
-        'Teacher': [teacher],
-        'Incident': [incident],
-        'Category': [category],
-        'Comment': [comment],
-        'Date': [datetime.now(sa_tz).date()]
-    })
-    incident_log = pd.concat([incident_log, new_incident], ignore_index=True)
-    incident_log.to_csv("incident_log.csv", index=False)
-    logger.info("Incident saved locally to incident_log.csv")
-
-    try:
-        g = Github(st.secrets["GITHUB_TOKEN"])
-        repo = g.get_repo("arnoldtRealph/hostel")
-        with open("incident_log.csv", "rb") as file:
-            content = file.read()
-        repo_path = "incident_log.csv"
-        try:
-            contents = repo.get_contents(repo_path, ref="master")
-            repo.update_file(
-                path=repo_path,
-                message="Updated incident_log.csv with new incident",
-                content=content,
-                sha=contents.sha,
-                branch="master"
-            )
-            logger.info("Incident log updated on GitHub")
-        except:
-            repo.create_file(
-                path=repo_path,
-                message="Created incident_log.csv with new incident",
-                content=content,
-                branch="master"
-            )
-            logger.info("Incident log created on GitHub")
-    except Exception as e:
-        logger.error(f"Failed to push to GitHub: {e}")
-        st.error(f"Kon nie na GitHub stoot nie: {e}")
-
-    return incident_log
-
-# Save general happening to log
-def save_happening(learner_full_name, block, event, comment):
-    if not all([learner_full_name != 'Kies', block != 'Kies', event, comment]):
-        logger.warning("Incomplete happening fields, saving skipped.")
-        st.warning("Alle velde moet ingevul wees om die gebeurtenis te stoor.")
-        return load_happenings_log()
-        
-    happenings_log = load_happenings_log()
-    sa_tz = pytz.timezone('Africa/Johannesburg')
-    new_happening = pd.DataFrame({
-        'Learner_Full_Name': [learner_full_name],
-        'Block': [block],
-        'Event': [event],
-        'Comment': [comment],
-        'Date': [datetime.now(sa_tz).date()]
-    })
-    happenings_log = pd.concat([happenings_log, new_happening], ignore_index=True)
-    happenings_log.to_csv("happenings_log.csv", index=False)
-    logger.info("Happening saved locally to happenings_log.csv")
-
-    try:
-        g = Github(st.secrets["GITHUB_TOKEN"])
-        repo = g.get_repo("arnoldtRealph/hostel")
-        with open("happenings_log.csv", "rb") as file:
-            content = file.read()
-        repo_path = "happenings_log.csv"
-        try:
-            contents = repo.get_contents(repo_path, ref="master")
-            repo.update_file(
-                path=repo_path,
-                message="Updated happenings_log.csv with new happening",
-                content=content,
-                sha=contents.sha,
-                branch="master"
-            )
-            logger.info("Happenings log updated on GitHub")
-        except:
-            repo.create_file(
-                path=repo_path,
-                message="Created happenings_log.csv with new happening",
-                content=content,
-                branch="master"
-            )
-            logger.info("Happenings log created on GitHub")
-    except Exception as e:
-        logger.error(f"Failed to push to GitHub: {e}")
-        st.error(f"Kon nie na GitHub stoot nie: {e}")
-
-    return happenings_log
-
-# Clear a single incident
-def clear_incident(index):
-    incident_log = load_incident_log()
-    if index in incident_log.index:
-        incident_log = incident_log.drop(index)
-        incident_log.to_csv("incident_log.csv", index=False)
-        logger.info(f"Incident at index {index} cleared locally")
-
-        try:
-            g = Github(st.secrets["GITHUB_TOKEN"])
-            repo = g.get_repo("arnoldtRealph/hostel")
-            with open("incident_log.csv", "rb") as file:
-                content = file.read()
-            repo_path = "incident_log.csv"
-            try:
-                contents = repo.get_contents(repo_path, ref="master")
-                repo.update_file(
-                    path=repo_path,
-                    message="Updated incident_log.csv after clearing incident",
-                    content=content,
-                    sha=contents.sha,
-                    branch="master"
-                )
-                logger.info("Incident log updated on GitHub after clearing")
-            except:
-                repo.create_file(
-                    path=repo_path,
-                    message="Created incident_log.csv after clearing incident",
-                    content=content,
-                    branch="master"
-                )
-                logger.info("Incident log created on GitHub after clearing")
-        except Exception as e:
-            logger.error(f"Failed to push to GitHub: {e}")
-            st.error(f"Kon nie na GitHub stoot nie: {e}")
-
-        return incident_log
-    else:
-        logger.warning(f"Invalid index {index} for clearing")
-        st.warning(f"Ongeldige indeks {index} vir verwydering.")
-    return incident_log
-
-# Clear a single happening
-def clear_happening(index):
-    happenings_log = load_happenings_log()
-    if index in happenings_log.index:
-        happenings_log = happenings_log.drop(index)
-        happenings_log.to_csv("happenings_log.csv", index=False)
-        logger.info(f"Happening at index {index} cleared locally")
-
-        try:
-            g = Github(st.secrets["GITHUB_TOKEN"])
-            repo = g.get_repo("arnoldtRealph/hostel")
-            with open("happenings_log.csv", "rb") as file:
-                content = file.read()
-            repo_path = "happenings_log.csv"
-            try:
-                contents = repo.get_contents(repo_path, ref="master")
-                repo.update_file(
-                    path=repo_path,
-                    message="Updated happenings_log.csv after clearing happening",
-                    content=content,
-                    sha=contents.sha,
-                    branch="master"
-                )
-                logger.info("Happenings log updated on GitHub after clearing")
-            except:
-                repo.create_file(
-                    path=repo_path,
-                    message="Created happenings_log.csv after clearing happening",
-                    content=content,
-                    branch="master"
-                )
-                logger.info("Happenings log created on GitHub after clearing")
-        except Exception as e:
-            logger.error(f"Failed to push to GitHub: {e}")
-            st.error(f"Kon nie na GitHub stoot nie: {e}")
-
-        return happenings_log
-    else:
-        logger.warning(f"Invalid index {index} for clearing")
-        st.warning(f"Ongeldige indeks {index} vir verwydering.")
-    return happenings_log
-
-# Generate Word document for incidents and happenings
-def generate_word_report(incident_df, happenings_df, learner_name=None):
-    doc = Document()
-    title = f'Hostel Verslag - {learner_name}' if learner_name else 'Hostel Verslag'
-    doc.add_heading(title, 0)
-
-    # Incidents Section
-    doc.add_heading('Insident Besonderhede', level=1)
-    if not incident_df.empty:
-        table = doc.add_table(rows=1, cols=len(incident_df.columns))
-        table.style = 'Table Grid'
-        for i, col in enumerate(incident_df.columns):
-            table.cell(0, i).text = {
-                'Learner_Full_Name': 'Leerder Naam',
-                'Block': 'Blok',
-                'Teacher': 'Toesighouer',
-                'Incident': 'Insident',
-                'Category': 'Kategorie',
-                'Comment': 'Kommentaar',
-                'Date': 'Datum'
-            }.get(col, col)
-        for _, row in incident_df.iterrows():
-            cells = table.add_row().cells
-            for i, col in enumerate(incident_df.columns):
-                cells[i].text = str(row[col]) if col != 'Date' else row[col].strftime("%Y-%m-%d") if pd.notnull(row[col]) else 'Onbekend2999'
+    if status['last_synced']:
+        last_synced = datetime.fromtimestamp(status['last_synced'], sa_tz).strftime("%Y-%m-%d %H:%M:%S")
     else:
-        doc.add_paragraph('Geen insidente gerapporteer nie.')
-
-    # General Happenings Section
-    doc.add_heading('Algemene Gebeurtenisse', level=1)
-    if not happenings_df.empty:
-        table = doc.add_table(rows=1, cols=len(happenings_df.columns))
-        table.style = 'Table Grid'
-        for i, col in enumerate(happenings_df.columns):
-            table.cell(0, i).text = {
-                'Learner_Full_Name': 'Leerder Naam',
-                'Block': 'Blok',
-                'Event': 'Gebeurtenis',
-                'Comment': 'Kommentaar',
-                'Date': 'Datum'
-            }.get(col, col)
-        for _, row in happenings_df.iterrows():
-            cells = table.add_row().cells
-            for i, col in enumerate(happenings_df.columns):
-                cells[i].text = str(row[col]) if col != 'Date' else row[col].strftime("%Y-%m-%d") if pd.notnull(row[col]) else 'Onbekend2999'
+        last_synced = "nog nie in hierdie sessie nie"
+    if status['pending']:
+        text = f"GitHub-sinkronisering: {status['changes']} verandering(e) wag ({', '.join(status['pending'])}). Laaste sinkronisering: {last_synced}."
+        if status['last_error']:
+            text += f" Laaste fout: {status['last_error']}"
     else:
-        doc.add_paragraph('Geen algemene gebeurtenisse gerapporteer nie.')
-
-    # Analysis Section
-    doc.add_heading('Insident Analise', level=1)
-
-    # Bar chart: Incidents by Category
-    if not incident_df.empty:
-        fig, ax = plt.subplots(figsize=(4, 2.5))
-        category_counts = incident_df['Category'].value_counts().sort_index()
-        sns.barplot(x=category_counts.index, y=category_counts.values, ax=ax, palette='Blues')
-        ax.set_title('Insidente volgens Kategorie', pad=10, fontsize=12, weight='bold')
-        ax.set_xlabel('Kategorie', fontsize=10)
-        ax.set_ylabel('Aantal', fontsize=10)
-        ax.yaxis.set_major_locator(MaxNLocator(integer=True))
-        plt.tight_layout(pad=1.0)
-        img_stream = io.BytesIO()
-        plt.savefig(img_stream, format='png', dpi=100, bbox_inches='tight')
-        plt.close()
-        doc.add_picture(img_stream, width=Inches(3.5))
-
-        # Bar chart: Incidents by Block
-        if 'Block' in incident_df.columns:
-            fig, ax = plt.subplots(figsize=(4, 2.5))
-            block_counts = incident_df['Block'].value_counts()
-            sns.barplot(x=block_counts.index, y=block_counts.values, ax=ax, palette='Blues')
-            ax.set_title('Insidente volgens Blok', pad=10, fontsize=12, weight='bold')
-            ax.set_xlabel('Blok', fontsize=10)
-            ax.set_ylabel('Aantal', fontsize=10)
-            ax.yaxis.set_major_locator(MaxNLocator(integer=True))
-            ax.tick_params(axis='x', rotation=45, labelsize=9)
-            plt.tight_layout(pad=1.0)
-            img_stream = io.BytesIO()
-            plt.savefig(img_stream, format='png', dpi=100, bbox_inches='tight')
-            plt.close()
-            doc.add_picture(img_stream, width=Inches(3.5))
-        else:
-            doc.add_paragraph('Geen Blok-data beskikbaar vir analise nie.')
+        text = f"GitHub-sinkronisering: alles gesinkroniseer. Laaste sinkronisering: {last_synced}."
+    st.caption(text)
+
+# Remember which log versions this session has rendered
+def remember_log_versions():
+    stores = get_log_stores()
+    st.session_state.log_versions = {name: store.version for name, store in stores.items()}
+
+# Rerun open sessions when another session (or process) changed a log.
+# Only compares version counters; the reload itself happens once, in the store.
+@st.fragment(run_every=10)
+def watch_log_versions():
+    if changed_logs():
+        st.toast("Nuwe inskrywings is bygevoeg. Die bladsy word verfris.")
+        st.rerun(scope="app")
+
+# Logs (of those named, or all) whose version moved since this session's last
+# full render; each store reloads first if its file or table changed
+def changed_logs(*names):
+    seen = st.session_state.get('log_versions')
+    if seen is None:
+        return []
+    stores = get_log_stores()
+    names = names or tuple(stores)
+    for name in names:
+        stores[name].get()
+    return [name for name in names if stores[name].version != seen.get(name)]
+
+# Called first in each page fragment: a fragment-only rerun keeps the rest of
+# the page as drawn, so once a log it shows has changed the whole page reruns
+# to keep the sections in step; otherwise only the fragment recomputes
+def refresh_page_if_logs_changed(*names):
+    if changed_logs(*names):
+        st.rerun(scope="app")
+
+# After a save inside a fragment: rerun the whole page if it wrote anything,
+# carrying the success message across the rerun
+def rerun_page_if_saved(before, notice_key, message):
+    if log_versions() != before:
+        st.session_state[notice_key] = message
+        st.rerun(scope="app")
+
+def show_form_notice(notice_key):
+    message = st.session_state.pop(notice_key, None)
+    if message:
+        st.success(message)
+
+# Confirmation of the last clear with an undo button, while undo is possible
+def render_undo_notice(log):
+    cleared = st.session_state.get('last_cleared')
+    if cleared is None or cleared['log'] != log or time.time() - cleared['at'] > UNDO_SECONDS:
+        return
+    st.success(f"{cleared['label']} suksesvol verwyder!")
+    st.button("Ontdoen", key=f"undo_clear_{log}", on_click=undo_last_clear, help="Herstel die verwyderde inskrywing")
+
+# Learner multiselect narrowed by a search box over the roster. Learners
+# already chosen stay in the options so narrowing never drops them, and a
+# new search can add more learners to the same entry.
+def learner_picker(roster, key):
+    query = st.text_input("", placeholder="Soek op van of naam...", key=f"{key}_search")
+    chosen = tuple(st.session_state.get(key, ()))
+    if not query:
+        options = roster.names[1:]
     else:
-        doc.add_paragraph('Geen insident-data beskikbaar vir analise nie.')
-
-    doc_stream = io.BytesIO()
-    doc.save(doc_stream)
-    doc_stream.seek(0)
-    return doc_stream
-
-# Load data
-learner_df = load_learner_data()
-incident_log = load_incident_log()
-happenings_log = load_happenings_log()
-
-# Main content
-with st.container():
-    st.title("HOSTEL INSIDENT EN GEBEURTENIS VERSLAG")
-    st.subheader("Hoërskool Saul Damon Hostel")
-
-# Initialize session state for sanction notifications
-if 'sanction_popups' not in st.session_state:
-    st.session_state.sanction_popups = {}
-
-# Compute sanctions based on incident counts
-if not incident_log.empty:
-    tally_df = incident_log.pivot_table(
-        index='Learner_Full_Name',
-        columns='Category',
-        values='Incident',
-        aggfunc='count',
-        fill_value=0
-    )
-    for cat in ['1', '2', '3', '4']:
-        if cat not in tally_df.columns:
-            tally_df[cat] = 0
-    tally_df = tally_df[['1', '2', '3', '4']].reset_index()
-
-    sanctions = []
-    for _, row in tally_df.iterrows():
-        learner = row['Learner_Full_Name']
-        if row['1'] > 5:
-            sanctions.append({
-                'Learner': learner,
-                'Category': '1',
-                'Count': int(row['1']),
-                'Sanction': 'Waarskuwing en ouerberaad met hosteltoesighouer.'
-            })
-        if row['2'] > 3:
-            sanctions.append({
-                'Learner': learner,
-                'Category': '2',
-                'Count': int(row['2']),
-                'Sanction': 'Tydelike verbod op hostelaktiwiteite.'
-            })
-        if row['3'] > 2:
-            sanctions.append({
-                'Learner': learner,
-                'Category': '3',
-                'Count': int(row['3']),
-                'Sanction': 'Ouers moet afspraak maak met hostelbestuur.'
-            })
-        if row['4'] >= 1:
-            sanctions.append({
-                'Learner': learner,
-                'Category': '4',
-                'Count': int(row['4']),
-                'Sanction': 'Verwysing na dissiplinêre komitee.'
-            })
-
-    sanctions_df = pd.DataFrame(sanctions)
-
-    for _, row in sanctions_df.iterrows():
-        key = f"{row['Learner']}_{row['Category']}"
-        if key not in st.session_state.sanction_popups:
-            st.session_state.sanction_popups[key] = True
-
-    st.markdown('<div class="notification-container">', unsafe_allow_html=True)
-    any_notifications = False
-    for _, row in sanctions_df.iterrows():
-        key = f"{row['Learner']}_{row['Category']}"
-        if st.session_state.sanction_popups.get(key, False):
-            any_notifications = True
-            st.markdown(
-                f"""
-                <div style='padding: 15px; border-radius: 8px;'>
-                    <h4 style='margin: 0;'>SANKSIEMELDING</h4>
-                    <p style='margin: 5px 0; font-size: 0.9rem;'>
-                        Leerder <strong>{row['Learner']}</strong> het {row['Count']} Kategorie {row['Category']} insidente. 
-                        Sanksie: {row['Sanction']}
-                    </p>
-                </div>
-                """,
-                unsafe_allow_html=True
-            )
-            if st.button("Opgelos", key=f"sanction_resolve_{key}"):
-                st.session_state.sanction_popups[key] = False
-                st.rerun()
-    if not any_notifications:
-        st.markdown(
-            """
-            <div style='background: rgba(34, 197, 94, 0.2); padding: 15px; border-radius: 8px; border: 2px solid #34d399;'>
-                <p style='margin: 0; font-size: 0.9rem;'>Geen aktiewe sanksiemeldings nie.</p>
-            </div>
-            """,
-            unsafe_allow_html=True
-        )
-    st.markdown('</div>', unsafe_allow_html=True)
-
-# Report new incident
-st.header("Rapporteer Nuwe Insident")
-with st.container():
-    st.markdown('<div class="input-label">Leerder Naam</div>', unsafe_allow_html=True)
-    learner_full_name = st.selectbox("", options=['Kies'] + sorted(learner_df['Learner_Full_Name'].unique()), key="learner_full_name")
-    
-    st.markdown('<div class="input-label">Blok</div>', unsafe_allow_html=True)
-    block = st.selectbox("", options=['Kies'] + sorted(learner_df['Block'].unique()), key="block")
-    
-    st.markdown('<div class="input-label">Toesighouer</div>', unsafe_allow_html=True)
-    teacher = st.selectbox("", options=['Kies'] + sorted(learner_df['Teacher'].unique()), key="teacher")
-    
-    st.markdown('<div class="input-label">Insident</div>', unsafe_allow_html=True)
-    incident = st.selectbox("", options=['Kies'] + sorted(learner_df['Incident'].unique()), key="incident")
-    
-    st.markdown('<div class="input-label">Kategorie</div>', unsafe_allow_html=True)
-    category = st.selectbox("", options=['Kies', '1', '2', '3', '4'], key="category")
-    
-    st.markdown('<div class="input-label">Kommentaar</div>', unsafe_allow_html=True)
-    comment = st.text_area("", placeholder="Tik hier...", key="comment")
-    
-    if st.button("Stoor Insident"):
-        incident_log = save_incident(learner_full_name, block, teacher, incident, category, comment)
-        st.success("Insident suksesvol gestoor!")
-
-# Report new general happening
-st.header("Rapporteer Algemene Gebeurtenis")
-with st.container():
-    st.markdown('<div class="input-label">Leerder Naam</div>', unsafe_allow_html=True)
-    happening_learner = st.selectbox("", options=['Kies'] + sorted(learner_df['Learner_Full_Name'].unique()), key="happening_learner")
-    
-    st.markdown('<div class="input-label">Blok</div>', unsafe_allow_html=True)
-    happening_block = st.selectbox("", options=['Kies'] + sorted(learner_df['Block'].unique()), key="happening_block")
-    
-    st.markdown('<div class="input-label">Gebeurtenis</div>', unsafe_allow_html=True)
-    event = st.text_input("", placeholder="Beskryf die gebeurtenis (bv. Siek, na hostel gestuur)", key="event")
-    
-    st.markdown('<div class="input-label">Kommentaar</div>', unsafe_allow_html=True)
-    happening_comment = st.text_area("", placeholder="Tik hier...", key="happening_comment")
-    
-    if st.button("Stoor Gebeurtenis"):
-        happenings_log = save_happening(happening_learner, happening_block, event, happening_comment)
-        st.success("Gebeurtenis suksesvol gestoor!")
-
-# Incident log display
-st.header("Insident Log")
-if not incident_log.empty:
-    display_log = incident_log.copy()
-    display_log.index = display_log.index + 1
+        matches = roster.name_index.search(query)
+        options = chosen + tuple(name for name in matches if name not in chosen)
+    return st.multiselect("", options=options, placeholder="Kies een of meer leerders", key=key)
+
+LOG_COLUMN_CONFIG = {
+    "Learner_Full_Name": st.column_config.TextColumn("Leerder Naam", width="medium"),
+    "Block": st.column_config.TextColumn("Blok", width="small"),
+    "Teacher": st.column_config.TextColumn("Toesighouer", width="medium"),
+    "Incident": st.column_config.TextColumn("Insident", width="medium"),
+    "Event": st.column_config.TextColumn("Gebeurtenis", width="medium"),
+    "Category": st.column_config.TextColumn("Kategorie", width="small"),
+    "Comment": st.column_config.TextColumn("Kommentaar", width="large"),
+    "Date": st.column_config.DateColumn("Datum", width="medium", format="YYYY-MM-DD"),
+    "Id": None
+}
+SORT_LABELS = {'Date': 'Datum', 'Learner_Full_Name': 'Leerder Naam', 'Block': 'Blok', 'Teacher': 'Toesighouer', 'Category': 'Kategorie'}
+PAGE_SIZES = (25, 50, 100)
+
+# Distinct values of a log column for a filter; categories are already distinct
+def _column_options(df, col):
+    values = df[col].cat.categories if isinstance(df[col].dtype, pd.CategoricalDtype) else df[col].dropna().unique()
+    return sorted(str(value) for value in values)
+
+# Sort alphabetically even when appends left a Categorical's categories unsorted
+def _sort_key(values):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.set_categories(sorted(values.cat.categories))
+    return values
+
+# One page of a log, filtered and sorted on the server; only that page is sent
+# to the browser. Filters, sort and page size live in session state under
+# `key`. With a store, the date filter reads through store.rows_between (an
+# indexed query or only the months in range). Shown indexes are the rows'
+# 1-based positions in the log, as used by the remove forms.
+def paged_log_view(df, key, store=None, filters=True):
+    rows = df
+    if filters:
+        with st.expander("Filter en Sorteer"):
+            filter_col1, filter_col2 = st.columns(2)
+            period = filter_col1.date_input("Tydperk", value=(), key=f"{key}_period")
+            blocks = filter_col2.multiselect("Blok", options=_column_options(df, 'Block'), key=f"{key}_blocks")
+            categories = teachers = []
+            if 'Category' in df.columns:
+                categories = filter_col1.multiselect("Kategorie", options=_column_options(df, 'Category'), key=f"{key}_categories")
+            if 'Teacher' in df.columns:
+                teachers = filter_col2.multiselect("Toesighouer", options=_column_options(df, 'Teacher'), key=f"{key}_teachers")
+            sort_columns = [col for col in SORT_LABELS if col in df.columns]
+            sort_by = filter_col1.selectbox("Sorteer volgens", options=['Log volgorde'] + sort_columns, format_func=lambda col: SORT_LABELS.get(col, col), key=f"{key}_sort")
+            descending = filter_col2.checkbox("Aflopend", key=f"{key}_descending")
+        if len(period) == 2:
+            rows = store.rows_between(*period) if store is not None else rows[rows['Date'].between(pd.Timestamp(period[0]), pd.Timestamp(period[1]))]
+        for col, chosen in (('Block', blocks), ('Category', categories), ('Teacher', teachers)):
+            if chosen:
+                rows = rows[rows[col].isin(chosen)]
+        if sort_by != 'Log volgorde':
+            rows = rows.sort_values(sort_by, ascending=not descending, kind='stable', key=_sort_key)
+        elif descending:
+            rows = rows.iloc[::-1]
+
+    page_size = st.session_state.get(f"{key}_page_size", PAGE_SIZES[0])
+    pages = max(1, -(-len(rows) // page_size))
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = pages
+    start = (st.session_state.get(f"{key}_page", 1) - 1) * page_size
+    page = rows.iloc[start:start + page_size]
+    page.index = page.index + 1
     st.dataframe(
-        display_log,
-        use_container_width=True,
-        column_config={
-            "Learner_Full_Name": st.column_config.TextColumn("Leerder Naam", width="medium"),
-            "Block": st.column_config.TextColumn("Blok", width="small"),
-            "Teacher": st.column_config.TextColumn("Toesighouer", width="medium"),
-            "Incident": st.column_config.TextColumn("Insident", width="medium"),
-            "Category": st.column_config.TextColumn("Kategorie", width="small"),
-            "Comment": st.column_config.TextColumn("Kommentaar", width="large"),
-            "Date": st.column_config.DateColumn("Datum", width="medium", format="YYYY-MM-DD")
-        }
+        page,
+        width="stretch",
+        column_config={col: config for col, config in LOG_COLUMN_CONFIG.items() if col in page.columns}
     )
+    nav_col1, nav_col2, nav_col3 = st.columns([1, 1, 2])
+    nav_col1.number_input("Bladsy", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+    nav_col2.selectbox("Rye per bladsy", options=PAGE_SIZES, key=f"{key}_page_size")
+    nav_col3.caption(f"Rye {start + 1 if len(rows) else 0}-{start + len(page)} van {len(rows)}")
+
+# Wall-clock seconds spent in each startup phase of this process. Each phase
+# is recorded once: the first (cold) time it runs.
+class StartupTimer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.phases = {}
+        self.reported = False
+
+    def record(self, name, seconds):
+        with self._lock:
+            self.phases.setdefault(name, seconds)
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def report(self):
+        with self._lock:
+            return pd.DataFrame({'Fase': list(self.phases), 'Sekondes': [round(seconds, 3) for seconds in self.phases.values()]})
+
+@st.cache_resource
+def get_startup_timer():
+    return StartupTimer()
+
+# Load the logs and import the chart, report and GitHub libraries on a
+# background thread at startup, so the first save, report or sync does not
+# pay for them. The script thread meanwhile loads the roster; it waits on
+# a store's lock only if it needs a log before the thread has loaded it.
+def _prewarm(timer, stores):
+    tasks = [(f"{name} log", store.get) for name, store in stores.items()] + [
+        ("chart libraries", load_charting),
+        ("Word library", lambda: __import__("docx")),
+        ("GitHub library", lambda: __import__("github")),
+    ]
+    for name, task in tasks:
+        try:
+            with timer.phase(f"pre-warm: {name}"):
+                task()
+        except Exception as e:
+            logger.warning(f"Pre-warming {name} failed: {e}")
+
+@st.cache_resource
+def start_prewarm():
+    thread = threading.Thread(target=_prewarm, args=(get_startup_timer(), get_log_stores()), name="prewarm", daemon=True)
+    thread.start()
+    return thread
+
+# The page. Streamlit runs this file as __main__; multiprocessing imports it
+# as __mp_main__ in every bulk-report worker, which must not render it.
+def main():
+    # Set page config
+    st.set_page_config(page_title="Hostel Insident Verslag", layout="wide")
+    st.markdown(PAGE_CSS, unsafe_allow_html=True)
+
+    # Load data
+    startup_timer = get_startup_timer()
+    startup_timer.record("imports", _IMPORTS_DONE - _SCRIPT_STARTED)
+    with startup_timer.phase("bootstrap"):
+        get_log_bootstrap()
+    try:
+        start_prewarm()
+        with startup_timer.phase("roster"):
+            roster = get_roster_options()
+        get_log_compactor()
+        get_remote_poller()
+        with startup_timer.phase("logs (script thread)"):
+            load_incident_log()
+            load_happenings_log()
+    except RemoteLogUnavailable as e:
+        logger.error(str(e))
+        st.error("Kon nie die logs van GitHub af laai nie. Probeer weer oor 'n rukkie.")
+        st.stop()
+    remember_log_versions()
+
+    # Main content
+    with st.container():
+        st.title("HOSTEL INSIDENT EN GEBEURTENIS VERSLAG")
+        st.subheader("Hoërskool Saul Damon Hostel")
+        render_sync_status()
+        watch_log_versions()
+
+    # Sanction notifications; "Opgelos" reruns only this panel
+    @st.fragment
+    def render_sanctions_panel():
+        refresh_page_if_logs_changed('incident')
+        incident_log = load_incident_log()
+        # Initialize session state for sanction notifications
+        if 'sanction_popups' not in st.session_state:
+            st.session_state.sanction_popups = {}
     
-    st.subheader("Verwyder Insident")
-    incident_index = st.number_input("Voer die indeks van die insident in om te verwyder (1-gebaseer)", min_value=1, max_value=len(incident_log), step=1)
-    if st.button("Verwyder Insident", key="clear_incident", help="Klik om die geselekteerde insident te verwyder"):
-        internal_index = incident_index - 1
-        incident_log = clear_incident(internal_index)
-        st.success(f"Insident by indeks {incident_index} suksesvol verwyder!")
-        st.rerun()
-else:
-    st.write("Geen insidente in die log nie.")
-
-# General happenings log display
-st.header("Algemene Gebeurtenisse Log")
-if not happenings_log.empty:
-    display_happenings = happenings_log.copy()
-    display_happenings.index = display_happenings.index + 1
-    st.dataframe(
-        display_happenings,
-        use_container_width=True,
-        column_config={
-            "Learner_Full_Name": st.column_config.TextColumn("Leerder Naam", width="medium"),
-            "Block": st.column_config.TextColumn("Blok", width="small"),
-            "Event": st.column_config.TextColumn("Gebeurtenis", width="medium"),
-            "Comment": st.column_config.TextColumn("Kommentaar", width="large"),
-            "Date": st.column_config.DateColumn("Datum", width="medium", format="YYYY-MM-DD")
-        }
-    )
+        # Sanctions based on incident counts
+        if not incident_log.empty:
+            sanctions_df = compute_sanctions()
     
-    st.subheader("Verwyder Gebeurtenis")
-    happening_index = st.number_input("Voer die indeks van die gebeurtenis in om te verwyder (1-gebaseer)", min_value=1, max_value=len(happenings_log), step=1)
-    if st.button("Verwyder Gebeurtenis", key="clear_happening", help="Klik om die geselekteerde gebeurtenis te verwyder"):
-        internal_index = happening_index - 1
-        happenings_log = clear_happening(internal_index)
-        st.success(f"Gebeurtenis by indeks {happening_index} suksesvol verwyder!")
-        st.rerun()
-else:
-    st.write("Geen algemene gebeurtenisse in die log nie.")
-
-# Download combined report
-st.download_button(
-    label="Laai Volledige Verslag af as Word",
-    data=generate_word_report(incident_log, happenings_log),
-    file_name="hostel_verslag.docx",
-    mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-)
-
-# Filter by learner
-st.header("Filter volgens Leerder")
-with st.container():
-    st.markdown('<div class="input-label">Kies Leerder</div>', unsafe_allow_html=True)
-    learner_filter = st.selectbox("", options=['Kies'] + sorted(set(incident_log['Learner_Full_Name'].unique()).union(happenings_log['Learner_Full_Name'].unique())), key="learner_filter")
+            for key in sanctions_df['Learner'] + '_' + sanctions_df['Category']:
+                st.session_state.sanction_popups.setdefault(key, True)
     
-    if learner_filter != 'Kies':
-        filtered_incident_log = incident_log[incident_log['Learner_Full_Name'] == learner_filter].copy()
-        filtered_happenings_log = happenings_log[happenings_log['Learner_Full_Name'] == learner_filter].copy()
+            st.markdown('<div class="notification-container">', unsafe_allow_html=True)
+            any_notifications = False
+            for _, row in sanctions_df.iterrows():
+                key = f"{row['Learner']}_{row['Category']}"
+                if st.session_state.sanction_popups.get(key, False):
+                    any_notifications = True
+                    st.markdown(
+                        f"""
+                        <div style='padding: 15px; border-radius: 8px;'>
+                            <h4 style='margin: 0;'>SANKSIEMELDING</h4>
+                            <p style='margin: 5px 0; font-size: 0.9rem;'>
+                                Leerder <strong>{row['Learner']}</strong> het {row['Count']} Kategorie {row['Category']} insidente. 
+                                Sanksie: {row['Sanction']}
+                            </p>
+                        </div>
+                        """,
+                        unsafe_allow_html=True
+                    )
+                    if st.button("Opgelos", key=f"sanction_resolve_{key}"):
+                        st.session_state.sanction_popups[key] = False
+                        st.rerun(scope="fragment")
+            if not any_notifications:
+                st.markdown(
+                    """
+                    <div style='background: rgba(34, 197, 94, 0.2); padding: 15px; border-radius: 8px; border: 2px solid #34d399;'>
+                        <p style='margin: 0; font-size: 0.9rem;'>Geen aktiewe sanksiemeldings nie.</p>
+                    </div>
+                    """,
+                    unsafe_allow_html=True
+                )
+            st.markdown('</div>', unsafe_allow_html=True)
+
+    # Report new incident
+    @st.fragment
+    def render_incident_form():
+        st.header("Rapporteer Nuwe Insident")
+        show_form_notice('incident_form_notice')
+        with st.container():
+            st.markdown('<div class="input-label">Leerder Naam (een of meer)</div>', unsafe_allow_html=True)
+            learner_names = learner_picker(roster, "learner_full_name")
         
-        st.subheader(f"Insidente vir {learner_filter}")
-        if not filtered_incident_log.empty:
-            filtered_incident_log.index = filtered_incident_log.index + 1
-            st.dataframe(
-                filtered_incident_log,
-                use_container_width=True,
-                column_config={
-                    "Learner_Full_Name": st.column_config.TextColumn("Leerder Naam", width="medium"),
-                    "Block": st.column_config.TextColumn("Blok", width="small"),
-                    "Teacher": st.column_config.TextColumn("Toesighouer", width="medium"),
-                    "Incident": st.column_config.TextColumn("Insident", width="medium"),
-                    "Category": st.column_config.TextColumn("Kategorie", width="small"),
-                    "Comment": st.column_config.TextColumn("Kommentaar", width="large"),
-                    "Date": st.column_config.DateColumn("Datum", width="medium", format="YYYY-MM-DD")
-                }
+            st.markdown('<div class="input-label">Blok</div>', unsafe_allow_html=True)
+            block = st.selectbox("", options=roster.blocks, key="block")
+        
+            st.markdown('<div class="input-label">Toesighouer</div>', unsafe_allow_html=True)
+            teacher = st.selectbox("", options=roster.teachers, key="teacher")
+        
+            st.markdown('<div class="input-label">Insident</div>', unsafe_allow_html=True)
+            incident = st.selectbox("", options=roster.incidents, key="incident")
+        
+            st.markdown('<div class="input-label">Kategorie</div>', unsafe_allow_html=True)
+            category = st.selectbox("", options=['Kies', '1', '2', '3', '4'], key="category")
+        
+            st.markdown('<div class="input-label">Kommentaar</div>', unsafe_allow_html=True)
+            comment = st.text_area("", placeholder="Tik hier...", key="comment")
+        
+            if st.button("Stoor Insident"):
+                before = log_versions()
+                save_incident(learner_names, block, teacher, incident, category, comment)
+                rerun_page_if_saved(before, 'incident_form_notice', "Insident suksesvol gestoor!")
+
+    # Report new general happening
+    @st.fragment
+    def render_happening_form():
+        st.header("Rapporteer Algemene Gebeurtenis")
+        show_form_notice('happening_form_notice')
+        with st.container():
+            st.markdown('<div class="input-label">Leerder Naam (een of meer)</div>', unsafe_allow_html=True)
+            happening_learners = learner_picker(roster, "happening_learner")
+        
+            st.markdown('<div class="input-label">Blok</div>', unsafe_allow_html=True)
+            happening_block = st.selectbox("", options=roster.blocks, key="happening_block")
+        
+            st.markdown('<div class="input-label">Gebeurtenis</div>', unsafe_allow_html=True)
+            event = st.text_input("", placeholder="Beskryf die gebeurtenis (bv. Siek, na hostel gestuur)", key="event")
+        
+            st.markdown('<div class="input-label">Kommentaar</div>', unsafe_allow_html=True)
+            happening_comment = st.text_area("", placeholder="Tik hier...", key="happening_comment")
+        
+            if st.button("Stoor Gebeurtenis"):
+                before = log_versions()
+                save_happening(happening_learners, happening_block, event, happening_comment)
+                rerun_page_if_saved(before, 'happening_form_notice', "Gebeurtenis suksesvol gestoor!")
+
+    # Incident log display
+    @st.fragment
+    def render_incident_log():
+        refresh_page_if_logs_changed('incident')
+        incident_log = load_incident_log()
+        st.header("Insident Log")
+        if not incident_log.empty:
+            paged_log_view(incident_log, "incident_log_view", store=get_log_stores()['incident'])
+        
+            st.subheader("Verwyder Insident")
+            incident_index = st.number_input("Voer die indeks van die insident in om te verwyder (1-gebaseer)", min_value=1, max_value=len(incident_log), step=1)
+            # The Id is bound when the button is drawn, so a save or clear by someone
+            # else before the click cannot shift the choice to another entry
+            st.button(
+                "Verwyder Insident", key="clear_incident", help="Klik om die geselekteerde insident te verwyder",
+                on_click=clear_incident, args=(incident_log['Id'].iloc[incident_index - 1], f"Insident by indeks {incident_index}")
             )
         else:
-            st.write("Geen insidente vir hierdie leerder nie.")
+            st.write("Geen insidente in die log nie.")
+        render_undo_notice('incident')
+
+    # General happenings log display
+    @st.fragment
+    def render_happenings_log():
+        refresh_page_if_logs_changed('happenings')
+        happenings_log = load_happenings_log()
+        st.header("Algemene Gebeurtenisse Log")
+        if not happenings_log.empty:
+            paged_log_view(happenings_log, "happenings_log_view", store=get_log_stores()['happenings'])
         
-        st.subheader(f"Algemene Gebeurtenisse vir {learner_filter}")
-        if not filtered_happenings_log.empty:
-            filtered_happenings_log.index = filtered_happenings_log.index + 1
-            st.dataframe(
-                filtered_happenings_log,
-                use_container_width=True,
-                column_config={
-                    "Learner_Full_Name": st.column_config.TextColumn("Leerder Naam", width="medium"),
-                    "Block": st.column_config.TextColumn("Blok", width="small"),
-                    "Event": st.column_config.TextColumn("Gebeurtenis", width="medium"),
-                    "Comment": st.column_config.TextColumn("Kommentaar", width="large"),
-                    "Date": st.column_config.DateColumn("Datum", width="medium", format="YYYY-MM-DD")
-                }
+            st.subheader("Verwyder Gebeurtenis")
+            happening_index = st.number_input("Voer die indeks van die gebeurtenis in om te verwyder (1-gebaseer)", min_value=1, max_value=len(happenings_log), step=1)
+            st.button(
+                "Verwyder Gebeurtenis", key="clear_happening", help="Klik om die geselekteerde gebeurtenis te verwyder",
+                on_click=clear_happening, args=(happenings_log['Id'].iloc[happening_index - 1], f"Gebeurtenis by indeks {happening_index}")
             )
         else:
-            st.write("Geen algemene gebeurtenisse vir hierdie leerder nie.")
-        
+            st.write("Geen algemene gebeurtenisse in die log nie.")
+        render_undo_notice('happenings')
+
+    # Download combined report, optionally for a period: the stores then read
+    # only the rows (and, when partitioned, only the months) in that range
+    @st.fragment
+    def render_report_download():
+        refresh_page_if_logs_changed('incident', 'happenings')
+        incident_log, happenings_log = load_incident_log(), load_happenings_log()
+        report_today = datetime.now(pytz.timezone('Africa/Johannesburg')).date()
+        log_dates = pd.concat([incident_log['Date'], happenings_log['Date']]).dropna()
+        report_start = log_dates.min().date() if not log_dates.empty else report_today
+        report_period = st.date_input("Verslag Tydperk", value=(report_start, report_today), key="report_period")
+        if len(report_period) == 2 and (report_period[0] > report_start or report_period[1] < report_today):
+            report_incidents = get_log_stores()['incident'].rows_between(*report_period)
+            report_happenings = get_log_stores()['happenings'].rows_between(*report_period)
+            report_file = f"hostel_verslag_{report_period[0]}_{report_period[1]}.docx"
+        else:
+            report_incidents, report_happenings = incident_log, happenings_log
+            report_file = "hostel_verslag.docx"
         st.download_button(
-            label=f"Laai {learner_filter} se Verslag af",
-            data=generate_word_report(filtered_incident_log, filtered_happenings_log, learner_filter),
-            file_name=f"verslag_{learner_filter.replace(' ', '_')}.docx",
-            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-            key="learner_report_download"
+            label="Laai Volledige Verslag af as Word",
+            data=lazy_word_report(report_incidents, report_happenings),
+            file_name=report_file,
+            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
         )
-    else:
-        st.write("Kies 'n leerder om insidente en gebeurtenisse te sien.")
 
-# Today's incidents
-st.header("Vandag se Insidente")
-today = datetime.now(pytz.timezone('Africa/Johannesburg')).date()
-today_incidents = incident_log[incident_log['Date'] == today]
-if not today_incidents.empty:
-    st.write(f"Totale Insidente Vandag: {len(today_incidents)}")
-    fig, ax = plt.subplots(figsize=(4, 2.5))
-    category_counts = today_incidents['Category'].value_counts().sort_index()
-    sns.barplot(x=category_counts.index, y=category_counts.values, ax=ax, palette='Blues')
-    ax.set_title('Insidente volgens Kategorie (Vandag)', pad=10, fontsize=12, weight='bold')
-    ax.set_xlabel('Kategorie', fontsize=10)
-    ax.set_ylabel('Aantal', fontsize=10)
-    ax.yaxis.set_major_locator(MaxNLocator(integer=True))
-    plt.tight_layout(pad=1.0)
-    st.pyplot(fig)
-    plt.close()
-else:
-    st.write("Geen insidente vandag gerapporteer nie.")
+    # Search comments and happenings
+    @st.fragment
+    def render_log_search():
+        refresh_page_if_logs_changed('incident', 'happenings')
+        st.header("Soek in Insidente en Gebeurtenisse")
+        with st.container():
+            search_query = st.text_input("", placeholder="Soek bv. hek, selfoon, siek...", key="log_search")
+            search_col1, search_col2, search_col3 = st.columns(3)
+            search_blocks = search_col1.multiselect("Blok", options=roster.blocks[1:], key="log_search_blocks")
+            search_category = search_col2.selectbox("Kategorie", options=['Alle', '1', '2', '3', '4'], key="log_search_category")
+            search_period = search_col3.date_input("Tydperk", value=(), key="log_search_period")
+            if search_query.strip():
+                search_results = search_logs(
+                    search_query,
+                    blocks=search_blocks,
+                    category=None if search_category == 'Alle' else search_category,
+                    start=search_period[0] if len(search_period) == 2 else None,
+                    end=search_period[1] if len(search_period) == 2 else None,
+                )
+                if not search_results.empty:
+                    search_results.index = search_results.index + 1
+                    st.dataframe(
+                        search_results.drop(columns='Score'),
+                        width="stretch",
+                        column_config={
+                            "Log": st.column_config.TextColumn("Log", width="small"),
+                            "Learner_Full_Name": st.column_config.TextColumn("Leerder Naam", width="medium"),
+                            "Block": st.column_config.TextColumn("Blok", width="small"),
+                            "Text": st.column_config.TextColumn("Teks", width="large"),
+                            "Date": st.column_config.DateColumn("Datum", width="medium", format="YYYY-MM-DD")
+                        }
+                    )
+                else:
+                    st.write("Geen resultate nie.")
+
+    # Filter by learner
+    @st.fragment
+    def render_learner_filter():
+        refresh_page_if_logs_changed('incident', 'happenings')
+        st.header("Filter volgens Leerder")
+        with st.container():
+            st.markdown('<div class="input-label">Kies Leerder</div>', unsafe_allow_html=True)
+            learner_filter = st.selectbox("", options=learner_filter_options(log_versions()), key="learner_filter")
+        
+            if learner_filter != 'Kies':
+                filtered_incident_log = get_log_stores()['incident'].rows_for_learner(learner_filter)
+                filtered_happenings_log = get_log_stores()['happenings'].rows_for_learner(learner_filter)
+            
+                st.subheader(f"Insidente vir {learner_filter}")
+                if not filtered_incident_log.empty:
+                    paged_log_view(filtered_incident_log, "learner_incident_view", filters=False)
+                else:
+                    st.write("Geen insidente vir hierdie leerder nie.")
+            
+                st.subheader(f"Algemene Gebeurtenisse vir {learner_filter}")
+                if not filtered_happenings_log.empty:
+                    paged_log_view(filtered_happenings_log, "learner_happenings_view", filters=False)
+                else:
+                    st.write("Geen algemene gebeurtenisse vir hierdie leerder nie.")
+            
+                st.download_button(
+                    label=f"Laai {learner_filter} se Verslag af",
+                    data=lazy_word_report(filtered_incident_log, filtered_happenings_log, learner_filter),
+                    file_name=f"verslag_{learner_filter.replace(' ', '_')}.docx",
+                    mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                    key="learner_report_download"
+                )
+            else:
+                st.write("Kies 'n leerder om insidente en gebeurtenisse te sien.")
+
+    # Term-end reports for a whole block, or every learner, as one ZIP
+    @st.fragment
+    def render_bulk_reports():
+        st.header("Bulk Verslae")
+        with st.container():
+            st.markdown('<div class="input-label">Blok</div>', unsafe_allow_html=True)
+            bulk_block = st.selectbox("", options=('Alle',) + roster.blocks[1:], key="bulk_report_block")
+            if st.button("Genereer Verslae", key="bulk_report_generate"):
+                learners = bulk_report_learners(bulk_block)
+                if learners:
+                    progress = st.progress(0.0, text=f"0 van {len(learners)} verslae gereed")
+                    out = io.BytesIO()
+                    started = time.perf_counter()
+                    try:
+                        for done, total in build_bulk_reports(learners, out):
+                            progress.progress(done / total, text=f"{done} van {total} verslae gereed")
+                    except Exception as e:
+                        logger.error(f"Bulk reports for {bulk_block} failed: {e}")
+                        st.error(f"Kon nie die verslae genereer nie: {e}")
+                    else:
+                        logger.info(f"Built {len(learners)} reports for {bulk_block} in {time.perf_counter() - started:.1f}s")
+                        st.session_state.bulk_report = (f"verslae_{bulk_block.replace(' ', '_')}.zip", out.getvalue())
+                else:
+                    st.write("Geen leerders in hierdie blok nie.")
+
+            bulk_report = st.session_state.get('bulk_report')
+            if bulk_report:
+                file_name, data = bulk_report
+                st.download_button(
+                    label=f"Laai {file_name} af",
+                    data=data,
+                    file_name=file_name,
+                    mime="application/zip",
+                    key="bulk_report_download"
+                )
 
-# Today's general happenings
-st.header("Vandag se Algemene Gebeurtenisse")
-today_happenings = happenings_log[happenings_log['Date'] == today]
-if not today_happenings.empty:
-    st.write(f"Totale Gebeurtenisse Vandag: {len(today_happenings)}")
-    today_happenings_display = today_happenings.copy()
-    today_happenings_display.index = today_happenings_display.index + 1
-    st.dataframe(
-        today_happenings_display,
-        use_container_width=True,
-        column_config={
-            "Learner_Full_Name": st.column_config.TextColumn("Leerder Naam", width="medium"),
-            "Block": st.column_config.TextColumn("Blok", width="small"),
-            "Event": st.column_config.TextColumn("Gebeurtenis", width="medium"),
-            "Comment": st.column_config.TextColumn("Kommentaar", width="large"),
-            "Date": st.column_config.DateColumn("Datum", width="medium", format="YYYY-MM-DD")
-        }
-    )
-else:
-    st.write("Geen algemene gebeurtenisse vandag gerapporteer nie.")
+    # Today's incidents
+    @st.fragment
+    def render_today_dashboard():
+        refresh_page_if_logs_changed('incident', 'happenings')
+        st.header("Vandag se Insidente")
+        today = datetime.now(pytz.timezone('Africa/Johannesburg')).date()
+        today_incidents = get_log_stores()['incident'].rows_on_date(today)
+        if not today_incidents.empty:
+            st.write(f"Totale Insidente Vandag: {len(today_incidents)}")
+            category_counts = today_incidents['Category'].astype(str).value_counts().sort_index()
+            # Same size and dpi st.pyplot would use, served from the shared chart cache
+            st.image(bar_chart_png(category_counts, 'Insidente volgens Kategorie (Vandag)', 'Kategorie', dpi=200, cache=get_chart_cache()), width="stretch")
+        else:
+            st.write("Geen insidente vandag gerapporteer nie.")
+    
+        # Today's general happenings
+        st.header("Vandag se Algemene Gebeurtenisse")
+        today_happenings = get_log_stores()['happenings'].rows_on_date(today)
+        if not today_happenings.empty:
+            st.write(f"Totale Gebeurtenisse Vandag: {len(today_happenings)}")
+            paged_log_view(today_happenings, "today_happenings_view", filters=False)
+        else:
+            st.write("Geen algemene gebeurtenisse vandag gerapporteer nie.")
+
+    # Incident trends over the term, from rollups shared by all sessions
+    @st.fragment
+    def render_trends():
+        refresh_page_if_logs_changed('incident')
+        load_incident_log()
+        trends = trend_rollups(get_log_stores()['incident'].version)
+        st.header("Tendense")
+        if trends.empty:
+            st.write("Geen gedateerde insidente om tendense te wys nie.")
+            return
+        trend_col1, trend_col2 = st.columns(2)
+        period = trend_col1.radio("Tydperk", options=list(TREND_FREQUENCIES), horizontal=True, key="trend_period")
+        dimension = trend_col2.selectbox("Groepeer volgens", options=list(TREND_DIMENSIONS), format_func=TREND_DIMENSIONS.get, key="trend_dimension")
+        st.bar_chart(trends.counts[period, dimension], x_label="Tydperk", y_label="Insidente")
+
+        st.subheader("Herhaalde Oortreders")
+        if not trends.offenders.empty:
+            st.dataframe(
+                trends.offenders,
+                width="stretch",
+                hide_index=True,
+                column_config={"Laaste": st.column_config.DateColumn("Laaste Insident", format="YYYY-MM-DD")}
+            )
+        else:
+            st.write("Geen leerders met herhaalde insidente nie.")
+
+        st.subheader("Insidente per Leerder per Week")
+        if not trends.heatmap.empty:
+            st.image(heatmap_png(trends.heatmap, f'Laaste {HEATMAP_WEEKS} weke', cache=get_chart_cache()), width="stretch")
+        else:
+            st.write(f"Geen insidente in die laaste {HEATMAP_WEEKS} weke nie.")
+
+    render_sanctions_panel()
+    render_incident_form()
+    render_happening_form()
+    render_incident_log()
+    render_happenings_log()
+    render_report_download()
+    render_log_search()
+    render_learner_filter()
+    render_bulk_reports()
+    render_today_dashboard()
+    render_trends()
+
+    remember_log_versions()
+
+    # Startup timing, logged once per process after the first full render
+    startup_timer.record("first render", time.perf_counter() - _SCRIPT_STARTED)
+    if not startup_timer.reported:
+        startup_timer.reported = True
+        logger.info("Startup timing:\n" + startup_timer.report().to_string(index=False))
+    with st.expander("Opstart Tydsberekening"):
+        st.dataframe(startup_timer.report(), hide_index=True)
+
+if __name__ == "__main__":
+    main()
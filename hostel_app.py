@@ -0,0 +1,2354 @@
+# Data, storage and GitHub sync for the hostel app: the roster, the log
+# stores and their backends, sanctions, search, trends and the save, clear
+# and report functions the page calls. hostel.py renders the page around
+# them; benchmark.py imports this module to time the same code without one.
+import streamlit as st
+import pandas as pd
+from datetime import datetime
+import pytz
+import io
+import logging
+import re
+import os
+import zipfile
+import multiprocessing
+import base64
+import csv
+import gzip
+import hashlib
+import json
+import sqlite3
+import tempfile
+import threading
+import time
+import unicodedata
+import uuid
+from bisect import bisect_left
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager, nullcontext
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: no advisory locks, single writer assumed
+    fcntl = None
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # snapshots are only an optimization; CSV parsing still works
+    pa = pq = None
+from hostel_reports import CHART_CACHE_SIZE, LruCache, generate_word_report, learner_reports, load_charting
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_STAMP_KEY = b'hostel_csv_stamp'
+
+def _snapshot_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".parquet"
+
+# Normalized, typed Parquet copy of a parsed CSV, kept next to it so a cold
+# start reads columns (memory-mapped) instead of parsing text. The CSV stays
+# the record and what is pushed to GitHub. A snapshot is only used while the
+# CSV's mtime and size still match the values recorded when it was written.
+def read_parquet_snapshot(csv_path):
+    if pq is None:
+        return None
+    stamp = _file_stamp(csv_path)
+    try:
+        table = pq.read_table(_snapshot_path(csv_path), memory_map=True)
+    except (OSError, pa.ArrowException):
+        return None
+    if stamp is None or (table.schema.metadata or {}).get(SNAPSHOT_STAMP_KEY) != json.dumps(stamp[:2]).encode():
+        return None
+    return table.to_pandas()
+
+# `stamp` is the CSV's _file_stamp taken before it was parsed
+def write_parquet_snapshot(csv_path, df, stamp):
+    if pq is None or stamp is None:
+        return
+    snapshot_path = _snapshot_path(csv_path)
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), SNAPSHOT_STAMP_KEY: json.dumps(stamp[:2]).encode()})
+        fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(snapshot_path) + ".", suffix=".tmp", dir=os.path.dirname(os.path.abspath(snapshot_path)))
+        os.close(fd)
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, snapshot_path)
+    except Exception as e:
+        logger.warning(f"Could not write snapshot {snapshot_path}: {e}")
+
+# Load and preprocess learner data. Shared by all sessions without a copy
+# per call: treat the frame as read-only.
+@st.cache_resource
+def load_learner_data():
+    try:
+        snapshot = read_parquet_snapshot("learner_list.csv")
+        if snapshot is not None:
+            return snapshot
+        stamp = _file_stamp("learner_list.csv")
+        df = pd.read_csv("learner_list.csv")
+        df.columns = df.columns.str.strip()
+        df['Learner_Full_Name'] = (df['Leerder van'].fillna('') + ' ' + df['Leerner se naam'].fillna('')).str.strip()
+        df = df.rename(columns={
+            'BLOK': 'Block',
+            'Opvoeder betrokke': 'Teacher',
+            'Wat het gebeur': 'Incident',
+            'Kategorie': 'Category'
+        })
+        df['Learner_Full_Name'] = df['Learner_Full_Name'].replace('', 'Onbekend2999')
+        df['Block'] = df['Block'].fillna('Onbekend2999')
+        df['Teacher'] = df['Teacher'].fillna('Onbekend2999')
+        df['Incident'] = df['Incident'].fillna('Onbekend2999')
+        df['Category'] = pd.to_numeric(df['Category'], errors='coerce').fillna(1).astype(int).astype(str)
+        df = df[['Learner_Full_Name', 'Block', 'Teacher', 'Incident', 'Category']]
+        write_parquet_snapshot("learner_list.csv", df, stamp)
+        return df
+    except FileNotFoundError:
+        logger.warning("learner_list.csv not found. Returning empty DataFrame.")
+        return pd.DataFrame(columns=['Learner_Full_Name', 'Block', 'Teacher', 'Incident', 'Category'])
+
+# Lowercase and strip accents, so "se" matches "Sé" and "o" matches "Ö"
+def fold_text(text):
+    text = unicodedata.normalize("NFKD", str(text).lower())
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+# Typeahead over learner names. Short queries match the start of any part
+# of a name (surname or given name) through a sorted token list; from three
+# characters on, any substring matches through a trigram index.
+class NameIndex:
+    def __init__(self, names):
+        self.names = tuple(names)
+        self._folded = [fold_text(name) for name in self.names]
+        self._tokens = sorted(
+            (token, i) for i, folded in enumerate(self._folded) for token in folded.split()
+        )
+        self._trigrams = {}
+        for i, folded in enumerate(self._folded):
+            for j in range(len(folded) - 2):
+                self._trigrams.setdefault(folded[j:j + 3], set()).add(i)
+
+    def _prefix_hits(self, query):
+        hits = set()
+        for token, i in self._tokens[bisect_left(self._tokens, (query,)):]:
+            if not token.startswith(query):
+                break
+            hits.add(i)
+        return hits
+
+    # Matching names, those with a part starting with the query first
+    def search(self, query, limit=50):
+        query = fold_text(query).strip()
+        if not query:
+            return self.names[:limit]
+        prefix = self._prefix_hits(query) if " " not in query else set()
+        if len(query) < 3:
+            hits = prefix
+        else:
+            grams = [self._trigrams.get(query[j:j + 3], set()) for j in range(len(query) - 2)]
+            hits = set.intersection(*sorted(grams, key=len))
+            hits = {i for i in hits if query in self._folded[i]} | prefix
+        return tuple(self.names[i] for i in sorted(hits, key=lambda i: (i not in prefix, i)))[:limit]
+
+# The roster's selectbox options, sorted once per roster load: frozen tuples
+# shared by every session and rerun
+class RosterOptions:
+    def __init__(self, learner_df):
+        def options(col):
+            return ('Kies',) + tuple(sorted(learner_df[col].unique()))
+        self.names = options('Learner_Full_Name')
+        self.blocks = options('Block')
+        self.teachers = options('Teacher')
+        self.incidents = options('Incident')
+        self.name_set = frozenset(self.names[1:])
+        self.name_index = NameIndex(self.names[1:])
+
+@st.cache_resource
+def get_roster_options():
+    return RosterOptions(load_learner_data())
+
+INCIDENT_COLUMNS = ['Learner_Full_Name', 'Block', 'Teacher', 'Incident', 'Category', 'Comment', 'Date', 'Id']
+HAPPENING_COLUMNS = ['Learner_Full_Name', 'Block', 'Event', 'Comment', 'Date', 'Id']
+
+# Every entry carries a stable Id, given when it is saved, so clears and
+# undo name the entry itself rather than its (shifting) row position
+def new_entry_id():
+    return uuid.uuid4().hex[:16]
+
+# Fill in Ids for entries saved before entries had one. The Id is derived
+# from the entry's content (and how many identical entries came before it),
+# so every process and backend derives the same Id for the same old row;
+# the next rewrite of the file stores it.
+def fill_entry_ids(df):
+    missing = df['Id'].isna() | (df['Id'].astype(str) == '')
+    if not missing.any():
+        return df
+    content = df.loc[missing, [col for col in df.columns if col != 'Id']].astype(str)
+    digests = pd.Series(
+        [hashlib.sha1("\x1f".join(values).encode("utf-8")).hexdigest()[:12] for values in content.itertuples(index=False, name=None)],
+        index=content.index
+    )
+    occurrence = digests.groupby(digests).cumcount().astype(str)
+    df = df.copy()
+    df.loc[missing, 'Id'] = 'legacy-' + digests + '-' + occurrence
+    return df
+
+# In memory the text columns of a log are pandas Categoricals: blocks,
+# supervisors, incidents, categories and learners have few distinct values,
+# and Event and Comment text is repeated for every learner of a multi-learner
+# save, so each distinct string is stored once. Dates are datetime64
+# (midnight), so date filters are vectorized comparisons instead of Python
+# date objects. Only the Id, unique per row, stays a plain string.
+def compact_log_frame(df):
+    df = df.copy()
+    for col in df.columns:
+        if col == 'Date':
+            df[col] = pd.to_datetime(df[col], errors='coerce').dt.normalize()
+        elif col == 'Id':
+            df[col] = df[col].astype('str')
+        elif not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    return df
+
+# A Parquet snapshot is only reused if it has the log's columns, typed the
+# way compact_log_frame types them (a snapshot written while Comment and
+# Event were plain strings is not); otherwise the CSV is parsed again and
+# the snapshot rewritten
+def is_log_snapshot(snapshot, columns):
+    return (snapshot is not None and list(snapshot.columns) == columns
+            and all(isinstance(snapshot[col].dtype, pd.CategoricalDtype) for col in columns if col not in ('Id', 'Date')))
+
+# Append rows to a compacted log frame. Categorical columns are extended by
+# their codes: the new rows' unseen values are added to the end of the
+# categories, so existing codes stay valid and nothing is re-encoded. The
+# categories index is hashed once per append (for the lookup), however many
+# distinct comments the log already holds.
+def _append_categorical(column, values):
+    categories = column.cat.categories
+    values = np.asarray(values, dtype=object)
+    codes = categories.get_indexer(values)
+    unseen = (codes < 0) & pd.notna(values)
+    if unseen.any():
+        new = pd.Index(pd.unique(values[unseen]), dtype=categories.dtype)
+        codes[unseen] = len(categories) + new.get_indexer(values[unseen])
+        categories = categories.append(new)
+    codes = np.concatenate([column.cat.codes.to_numpy(), codes])
+    return pd.Series(pd.Categorical.from_codes(codes, dtype=pd.CategoricalDtype(categories)))
+
+def concat_log_frames(df, rows):
+    rows = compact_log_frame(rows)
+    columns = {}
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            columns[col] = _append_categorical(df[col], rows[col])
+        else:
+            columns[col] = pd.concat([df[col], rows[col]], ignore_index=True)
+    return pd.DataFrame(columns)
+
+# Exclusive lock around a log file. The lock lives in a sidecar file so that
+# atomic rewrites (which replace the log's inode) do not drop the lock.
+@contextmanager
+def locked_log(path):
+    with open(path + ".lock", "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+# Replace a file atomically: write a temp file next to it, fsync, rename.
+def write_bytes_atomic(path, data):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(data)
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(directory, os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+# Replace a log file atomically; gzipped if the path ends in .gz.
+# Caller must hold locked_log(path).
+def write_log_atomic(path, df):
+    data = df.to_csv(index=False).encode("utf-8")
+    if path.endswith(".gz"):
+        data = gzip.compress(data, mtime=0)
+    write_bytes_atomic(path, data)
+
+def _read_header(path):
+    with open(path, "r", newline="", encoding="utf-8-sig") as f:
+        return next(csv.reader(f), None)
+
+# Append rows to a log. Only the new lines are written; the file is rewritten
+# (atomically) only when it is missing or its header does not match the
+# expected columns, e.g. an old export with Afrikaans headings.
+# Caller must hold locked_log(path).
+def append_log_rows(path, rows, columns, loader):
+    rows = rows[columns]
+    exists = os.path.exists(path) and os.path.getsize(path) > 0
+    if not exists or _read_header(path) != columns:
+        existing = loader() if exists else pd.DataFrame(columns=columns)
+        write_log_atomic(path, concat_log_frames(existing, rows) if exists else rows)
+        return
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        needs_newline = f.read(1) != b"\n"
+    with open(path, "a", newline="", encoding="utf-8") as f:
+        if needs_newline:
+            f.write("\n")
+        rows.to_csv(f, index=False, header=False)
+        f.flush()
+        os.fsync(f.fileno())
+
+def _file_stamp(path):
+    try:
+        st_result = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st_result.st_mtime_ns, st_result.st_size, st_result.st_ino)
+
+# Row positions of each learner in one log, kept by its store as a listener
+# so selecting a learner is a slice of their own rows instead of a scan.
+class LearnerIndex:
+    def __init__(self):
+        self._positions = {}
+        self._length = 0
+        self._names = None
+
+    def reset(self, df):
+        self._positions = df.groupby('Learner_Full_Name', observed=True, sort=False).indices if not df.empty else {}
+        self._length = len(df)
+        self._names = None
+
+    def append(self, rows):
+        new = np.arange(self._length, self._length + len(rows))
+        for learner, offsets in rows.groupby('Learner_Full_Name', observed=True, sort=False).indices.items():
+            if learner not in self._positions:
+                self._names = None
+            self._positions[learner] = np.concatenate([self._positions.get(learner, new[:0]), new[offsets]])
+        self._length += len(rows)
+
+    # Drop the removed positions and close the gaps they leave
+    def remove(self, rows):
+        removed = np.sort(rows.index.to_numpy())
+        positions = {}
+        for learner, rows_at in self._positions.items():
+            rows_at = rows_at[~np.isin(rows_at, removed)]
+            if len(rows_at):
+                positions[learner] = rows_at - np.searchsorted(removed, rows_at)
+            else:
+                self._names = None
+        self._positions = positions
+        self._length -= len(removed)
+
+    def positions(self, learner):
+        return self._positions.get(learner, np.arange(0))
+
+    # Sorted learner names, rebuilt only when a name appears or disappears
+    def names(self):
+        if self._names is None:
+            self._names = tuple(sorted(self._positions))
+        return self._names
+
+TOMBSTONE_COLUMNS = ['Id', 'Action', 'At']
+UNDO_SECONDS = 300  # a clear can be undone for this long; compaction waits as long
+
+# Append-only record of clears for one log: a 'delete' row per cleared entry
+# Id and a 'restore' row when a clear is undone (At is a Unix time). The
+# entry stays in its log file until compaction drops it; its records are then
+# replaced by a single 'compact' row, so a stale remote copy of the log that
+# still holds the entry cannot bring it back. A clear is a one-line append
+# that names the entry, not a rewrite by row position.
+class TombstoneLog:
+    def __init__(self, path):
+        self.path = path
+        self._stamp = None
+        self._deleted = {}
+        self._compacted = set()
+        self._hidden = set()
+
+    def stamp(self):
+        return _file_stamp(self.path)
+
+    def _read(self):
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return pd.DataFrame(columns=TOMBSTONE_COLUMNS)
+        return read_tombstones(self.path)
+
+    # Records merged from another app instance can land out of time order
+    def _refresh(self):
+        stamp = self.stamp()
+        if stamp != self._stamp:
+            last = self._read().sort_values('At', kind='stable').drop_duplicates('Id', keep='last')
+            deleted = last[last['Action'] == 'delete']
+            self._deleted = dict(zip(deleted['Id'], deleted['At'].astype(float)))
+            self._compacted = set(last.loc[last['Action'] == 'compact', 'Id'])
+            self._hidden = self._compacted.union(self._deleted)
+            self._stamp = stamp
+
+    # Id -> time of clearing, for entries whose latest record is a delete
+    def deleted(self):
+        self._refresh()
+        return self._deleted
+
+    # Ids of entries compaction has dropped from the log for good
+    def compacted(self):
+        self._refresh()
+        return self._compacted
+
+    # Ids to leave out of the visible log: cleared, or compacted by another
+    # app instance while this copy of the file still holds them
+    def hidden(self):
+        self._refresh()
+        return self._hidden
+
+    def record(self, ids, action):
+        ids = list(ids)
+        now = time.time()
+        rows = pd.DataFrame({'Id': ids, 'Action': action, 'At': round(now, 3)})
+        with locked_log(self.path):
+            current = self.stamp() == self._stamp
+            append_log_rows(self.path, rows, TOMBSTONE_COLUMNS, self._read)
+            if current:
+                for entry_id in ids:
+                    if action == 'delete':
+                        self._deleted[entry_id] = now
+                        self._hidden.add(entry_id)
+                    else:
+                        self._deleted.pop(entry_id, None)
+                        self._hidden.discard(entry_id)
+                self._stamp = self.stamp()
+
+    # Add the records another app instance made; returns how many were new.
+    # Records of an entry already compacted here are left out.
+    def merge(self, records):
+        with locked_log(self.path):
+            known = self._read()
+            seen = set(zip(known['Id'], known['Action'], known['At'].astype(float).round(3)))
+            compacted = set(known.loc[known['Action'] == 'compact', 'Id'])
+            keys = zip(records['Id'], records['Action'], records['At'].astype(float).round(3))
+            new = records[[key not in seen and key[0] not in compacted for key in keys]]
+            if not new.empty:
+                append_log_rows(self.path, new[TOMBSTONE_COLUMNS], TOMBSTONE_COLUMNS, self._read)
+                self._stamp = None
+            return len(new)
+
+    # Cleared entries past the undo window, ready to be compacted away
+    def expired(self, cutoff):
+        return {entry_id for entry_id, at in self.deleted().items() if at < cutoff}
+
+    # Replace the records of compacted entries with one 'compact' row each
+    def mark_compacted(self, ids):
+        ids = list(ids)
+        with locked_log(self.path):
+            records = self._read()
+            marks = pd.DataFrame({'Id': ids, 'Action': 'compact', 'At': round(time.time(), 3)})
+            write_log_atomic(self.path, pd.concat([records[~records['Id'].isin(ids)], marks], ignore_index=True))
+        self._stamp = None
+
+def read_tombstones(source):
+    return pd.read_csv(source, dtype={'Id': str, 'Action': str})
+
+# Each log's tombstones live next to it as <log>_deleted.csv
+def tombstone_path(log_path):
+    return os.path.splitext(log_path)[0] + "_deleted.csv"
+
+# Positions of the given entry Ids in a log frame
+def entry_positions(df, ids):
+    return np.flatnonzero(df['Id'].isin(list(ids)).to_numpy())
+
+# Entries of a freshly read log that another app instance has already
+# compacted away; the next compaction drops them from this copy too
+def compacted_leftovers(df, compacted):
+    if not compacted:
+        return set()
+    return set(df.loc[df['Id'].isin(list(compacted)), 'Id'])
+
+def drop_deleted(df, deleted):
+    if not deleted:
+        return df
+    return df[~df['Id'].isin(list(deleted))].reset_index(drop=True)
+
+# Process-wide parsed copy of one log, shared by every session. The entries
+# are kept by a backend (one CSV, a SQLite table or monthly CSV partitions);
+# clears are tombstones next to them, the same in every backend. The entries
+# are re-read only when the backend's stamp changes (another process wrote
+# them) or the tombstones change; this process's own saves and clears update
+# the frame in place. Cleared entries are left out of the frame until
+# compaction removes them from the backend. `version` increases on every
+# change so sessions can tell when there are new entries. Frames handed out
+# by get() are shared: treat them as read-only and .copy() before modifying.
+#
+# Derived structures (sanction counters, indexes) subscribe as listeners and
+# are kept up to date incrementally: reset(df) after a full (re)load,
+# append(rows) after a save and remove(rows) after a clear.
+#
+# A backend implements _source_stamp(), _read(), _write(rows) and
+# _drop(ids), and may override _prepare(), _write_lock() and the row lookups.
+class LogStore:
+    def __init__(self, path, columns, normalizer, tombstones_path):
+        self.path = path
+        self.location = path
+        self.columns = columns
+        self._normalizer = normalizer
+        self._tombstones = TombstoneLog(tombstones_path)
+        self._lock = threading.RLock()
+        self._merge_lock = threading.Lock()
+        self._df = None
+        self._stamp = None
+        self._leftover = set()
+        self._learners = LearnerIndex()
+        self._listeners = [self._learners]
+        self.version = 0
+
+    # Stamp of the stored entries; changes whenever any process writes them
+    def _source_stamp(self):
+        raise NotImplementedError
+
+    # Every stored entry, cleared ones included, in log order
+    def _read(self):
+        raise NotImplementedError
+
+    # Store new entries; returns True when they follow every stored entry,
+    # so the loaded frame can simply be extended
+    def _write(self, rows):
+        raise NotImplementedError
+
+    # Remove entries from storage for good; returns the paths written
+    def _drop(self, ids):
+        raise NotImplementedError
+
+    # Runs before every read and save (under the store lock)
+    def _prepare(self):
+        pass
+
+    # Held around saves and compaction, before the store lock, to keep other
+    # processes from writing in between
+    def _write_lock(self):
+        return nullcontext()
+
+    def subscribe(self, listener):
+        with self._lock:
+            self._listeners.append(listener)
+            if self._df is not None:
+                listener.reset(self._df)
+
+    def _notify(self, event, *args):
+        for listener in self._listeners:
+            getattr(listener, event)(*args)
+
+    def _stamps(self):
+        return (self._source_stamp(), self._tombstones.stamp())
+
+    def _is_current(self):
+        return self._df is not None and self._stamps() == self._stamp
+
+    def get(self):
+        with self._lock:
+            self._prepare()
+            stamp = self._stamps()
+            if self._df is None or stamp != self._stamp:
+                df = self._read()
+                self._leftover = compacted_leftovers(df, self._tombstones.compacted())
+                self._df = drop_deleted(df, self._tombstones.hidden())
+                # A CSV reader that fetched a missing file from GitHub has just created it
+                self._stamp = stamp if stamp[0] is not None else self._stamps()
+                self.version += 1
+                self._notify('reset', self._df)
+            return self._df
+
+    def append(self, rows):
+        rows = rows[self.columns]
+        with self._write_lock(), self._lock:
+            # A log that has never been read may still have to come from
+            # GitHub; get() raises RemoteLogUnavailable if it cannot
+            if self._df is None:
+                self.get()
+            self._prepare()
+            current = self._is_current()
+            extends = self._write(rows)
+            if current and extends:
+                self._df = concat_log_frames(self._df, rows)
+                self._stamp = self._stamps()
+                self._notify('append', compact_log_frame(rows))
+            else:
+                self._df = None
+            self.version += 1
+
+    # Clear the entries with the given Ids by appending tombstones.
+    # Returns the cleared rows (empty if none of the Ids is in the log).
+    def delete(self, ids):
+        with self._lock:
+            df = self.get()
+            removed = df.iloc[entry_positions(df, ids)]
+            if not removed.empty:
+                current = self._stamps() == self._stamp
+                self._tombstones.record(removed['Id'], 'delete')
+                self._df = df.drop(removed.index).reset_index(drop=True)
+                self._stamp = self._stamps() if current else None
+                self.version += 1
+                self._notify('remove', removed)
+            return removed
+
+    # Undo clears still inside the undo window; returns the restored Ids.
+    # The log is reloaded so the entries reappear in their old place.
+    def restore(self, ids):
+        with self._lock:
+            cutoff = time.time() - UNDO_SECONDS
+            deleted = self._tombstones.deleted()
+            ids = [entry_id for entry_id in ids if deleted.get(entry_id, 0) >= cutoff]
+            if ids:
+                self._tombstones.record(ids, 'restore')
+                self._df = None
+                self.version += 1
+            return ids
+
+    # Drop entries cleared before `cutoff` from storage and mark them
+    # compacted. The visible log does not change. Returns the paths written.
+    def compact(self, cutoff):
+        with self._write_lock(), self._lock:
+            expired = self._tombstones.expired(cutoff) | self._leftover
+            if not expired:
+                return []
+            current = self._is_current()
+            written = self._drop(expired)
+            self._tombstones.mark_compacted(expired)
+            self._leftover = set()
+            if current:
+                self._stamp = self._stamps()
+            logger.info(f"Compacted {len(expired)} cleared entries out of {self.location}")
+            return written + [self._tombstones.path]
+
+    # Run fn(df) on the current frame while no save or clear can change it,
+    # so row positions from a listener's index match the frame
+    def with_frame(self, fn):
+        with self._lock:
+            return fn(self.get())
+
+    def rows_for_learner(self, learner):
+        with self._lock:
+            df = self.get()
+            return df.iloc[self._learners.positions(learner)]
+
+    def learners(self):
+        with self._lock:
+            self.get()
+            return self._learners.names()
+
+    def rows_on_date(self, day):
+        df = self.get()
+        return df[df['Date'] == pd.Timestamp(day)]
+
+    def rows_between(self, start, end):
+        df = self.get()
+        return df[df['Date'].between(pd.Timestamp(start), pd.Timestamp(end))]
+
+    # Files that hold these rows and need pushing after they changed
+    def written_paths(self, rows):
+        return [self.path]
+
+    # Files that record clears and undos
+    def tombstone_paths(self):
+        return [self._tombstones.path]
+
+    # Files another app instance may change on GitHub
+    def remote_paths(self):
+        return [self.path, self._tombstones.path]
+
+    # Whether the file on GitHub holds part of this log
+    def owns(self, path):
+        return path in self.remote_paths()
+
+    # Add what another app instance wrote to the remote copy of `path`:
+    # entries whose Id is new here (and was not compacted away), or clears
+    # and undos not yet recorded.
+    # Returns the number of new records. The change poller and the sync
+    # worker (on a push conflict) both merge, one at a time, so the same
+    # remote entry is never appended twice.
+    def merge_remote(self, path, text):
+        with self._merge_lock:
+            if path == self._tombstones.path:
+                return self._tombstones.merge(read_tombstones(io.StringIO(text)))
+            remote = self._normalizer(pd.read_csv(io.StringIO(text)))
+            with self._lock:
+                known = set(self.get()['Id']).union(self._tombstones.deleted(), self._tombstones.compacted())
+            new = remote[~remote['Id'].isin(known)]
+            # append() may take a write lock before the store lock, so it must
+            # not be called with the store lock held
+            if not new.empty:
+                self.append(new)
+            return len(new)
+
+# A log kept in one CSV file (STORAGE_BACKEND = "csv", the default), with its
+# tombstones in <log>_deleted.csv
+class CsvLogStore(LogStore):
+    def __init__(self, path, columns, reader, normalizer):
+        super().__init__(path, columns, normalizer, tombstone_path(path))
+        self._reader = reader
+
+    def _source_stamp(self):
+        return _file_stamp(self.path)
+
+    def _read(self):
+        return self._reader()
+
+    def _write(self, rows):
+        append_log_rows(self.path, rows, self.columns, self._reader)
+        return True
+
+    def _drop(self, ids):
+        raw = self._reader()
+        write_log_atomic(self.path, raw[~raw['Id'].isin(list(ids))])
+        return [self.path]
+
+    def _write_lock(self):
+        return locked_log(self.path)
+
+# Optional settings come from the environment or .streamlit/secrets.toml
+def get_setting(name, default=None):
+    if name in os.environ:
+        return os.environ[name]
+    try:
+        return st.secrets.get(name, default)
+    except Exception:  # no secrets file at all
+        return default
+
+GITHUB_REPO = "arnoldtRealph/hostel"
+GITHUB_BRANCH = "master"
+SYNC_OUTBOX_PATH = ".github_outbox.json"
+SYNC_DEBOUNCE_SECONDS = 5      # wait this long after the last save before pushing
+SYNC_MAX_DELAY_SECONDS = 30    # but never hold a change back longer than this
+SYNC_MAX_BACKOFF_SECONDS = 300
+SYNC_CONFLICT_RETRIES = 3      # merge-and-push rounds before the push is retried later
+
+GITHUB_RATE_LIMIT_RESERVE = 20  # stop calling the API this many requests before the limit
+
+class GithubRateLimited(Exception):
+    def __init__(self, reset_at):
+        super().__init__(f"GitHub rate limit nearly exhausted, resets at {datetime.fromtimestamp(reset_at)}")
+        self.reset_at = reset_at
+
+# A log file is missing on disk and GitHub could not be asked whether it has
+# it. Nothing may be cached, written or pushed for it until a fetch succeeds,
+# or an empty local copy would be pushed over the remote history.
+class RemoteLogUnavailable(Exception):
+    def __init__(self, path, cause):
+        super().__init__(f"Could not fetch {path} from GitHub: {cause}")
+        self.path = path
+
+# Another app instance pushed a file since this process last read it. Its
+# changes are merged into the local copy before the file is pushed again.
+class PushConflict(Exception):
+    def __init__(self, path, status):
+        super().__init__(f"{path} changed on GitHub (HTTP {status})")
+        self.path = path
+
+# Process-wide GitHub repository client. Holds one authenticated session,
+# remembers the blob SHA of every file it has read or written so updates
+# need a single API call, and tracks the X-RateLimit headers so callers back
+# off before GitHub starts refusing requests. Calls are serialized, so one
+# instance can be shared by every session and the sync worker. `lock` is
+# only ever held around the API calls themselves, never while a store or
+# log file lock is taken: log stores fetch from GitHub while holding
+# theirs. Pushes go over a known SHA, so no read-merge-write has to hold it.
+class GithubRepoClient:
+    def __init__(self, token, repo_name=GITHUB_REPO, branch=GITHUB_BRANCH):
+        self.configured = bool(token)
+        self._token = token
+        self._repo_name = repo_name
+        self._github = None
+        self._repo = None
+        self._branch = branch
+        self.lock = threading.RLock()
+        self._shas = {}
+        self.rate_remaining = None
+        self.rate_reset = None
+
+    def _check_rate_limit(self):
+        if not self.configured:
+            raise RuntimeError("GITHUB_TOKEN is not configured")
+        if self._repo is None:
+            from github import Github
+            self._github = Github(self._token)
+            self._repo = self._github.get_repo(self._repo_name, lazy=True)
+        if self.rate_remaining is not None and self.rate_remaining <= GITHUB_RATE_LIMIT_RESERVE:
+            if self.rate_reset and self.rate_reset > time.time():
+                raise GithubRateLimited(self.rate_reset)
+
+    # Read the X-RateLimit-* values PyGithub stored from the last response.
+    # Goes through the requester so no extra /rate_limit call is made.
+    def _record_rate_limit(self):
+        requester = self._github.requester
+        remaining, _ = requester.rate_limiting
+        if remaining >= 0:
+            self.rate_remaining = remaining
+            self.rate_reset = requester.rate_limiting_resettime
+
+    def _fetch(self, path):
+        from github import GithubException
+        self._check_rate_limit()
+        try:
+            contents = self._repo.get_contents(path, ref=self._branch)
+        except GithubException as e:
+            if e.status != 404:
+                raise
+            self._shas.pop(path, None)
+            return None
+        finally:
+            self._record_rate_limit()
+        self._shas[path] = contents.sha
+        return contents
+
+    # Return the file's text, or None if it does not exist in the repository
+    def get_file(self, path):
+        with self.lock:
+            contents = self._fetch(path)
+            return None if contents is None else contents.decoded_content.decode('utf-8')
+
+    # Read several files at once (the cold start): path -> raw bytes (so
+    # gzipped archives come through intact), None if the file does not
+    # exist, or the exception its request raised. Only the round trips
+    # overlap; _fetch itself just sets SHA map entries and the rate-limit
+    # counters.
+    def get_files(self, paths):
+        with self.lock:
+            self._check_rate_limit()
+
+        def fetch(path):
+            try:
+                contents = self._fetch(path)
+            except Exception as e:
+                return e
+            return None if contents is None else contents.decoded_content
+
+        with ThreadPoolExecutor(max_workers=max(len(paths), 1), thread_name_prefix="github-fetch") as pool:
+            return dict(zip(paths, pool.map(fetch, paths)))
+
+    # Paths of the files in a repository directory, or None if it does not
+    # exist. Their SHAs are remembered, so pushing one needs no extra read.
+    def list_dir(self, path):
+        from github import GithubException
+        with self.lock:
+            self._check_rate_limit()
+            try:
+                entries = self._repo.get_contents(path, ref=self._branch)
+            except GithubException as e:
+                if e.status != 404:
+                    raise
+                return None
+            finally:
+                self._record_rate_limit()
+            if not isinstance(entries, list):
+                entries = [entries]
+            files = [entry for entry in entries if entry.type == "file"]
+            for entry in files:
+                self._shas[entry.path] = entry.sha
+            return [entry.path for entry in files]
+
+    # Conditional read for change polling. Returns (etag, sha, text): text is
+    # None when the file is unchanged since `etag` (a 304, which GitHub does
+    # not count against the rate limit), when its blob is the one this client
+    # last read or wrote, or when it does not exist. Call remember_sha() once
+    # the text has been merged locally.
+    def poll_file(self, path, etag=None):
+        from github import GithubException
+        with self.lock:
+            self._check_rate_limit()
+            try:
+                headers, data = self._github.requester.requestJsonAndCheck(
+                    "GET", f"{self._repo.url}/contents/{path}", parameters={"ref": self._branch},
+                    headers={"If-None-Match": etag} if etag else None
+                )
+            except GithubException as e:
+                if e.status != 404:
+                    raise
+                return None, None, None
+            finally:
+                self._record_rate_limit()
+            if data is None:
+                return etag, self._shas.get(path), None
+            etag, sha = headers.get("etag"), data["sha"]
+            if sha == self._shas.get(path):
+                return etag, sha, None
+            # Files over 1 MB come without inline content
+            if data.get("encoding") == "base64":
+                text = base64.b64decode(data["content"]).decode('utf-8')
+            else:
+                contents = self._repo.get_contents(path, ref=self._branch)
+                self._record_rate_limit()
+                sha, text = contents.sha, contents.decoded_content.decode('utf-8')
+            return etag, sha, text
+
+    def remember_sha(self, path, sha):
+        with self.lock:
+            self._shas[path] = sha
+
+    # SHA of the blob this process last read or wrote for the file (None if
+    # GitHub does not have it); the file is read once if it was never seen
+    def known_sha(self, path):
+        with self.lock:
+            if path not in self._shas:
+                self._fetch(path)
+            return self._shas.get(path)
+
+    # Create or update a file whose remote copy is the blob `sha` (None: a
+    # new file). Raises PushConflict if the remote changed since then; the
+    # caller merges it and pushes again, so what other app instances pushed
+    # is never overwritten.
+    def put_file(self, path, content, message, sha):
+        from github import GithubException
+        with self.lock:
+            self._check_rate_limit()
+            try:
+                if sha is None:
+                    result = self._repo.create_file(path=path, message=message, content=content, branch=self._branch)
+                else:
+                    result = self._repo.update_file(path=path, message=message, content=content, sha=sha, branch=self._branch)
+            except GithubException as e:
+                # 409: stale SHA, 422: file appeared since we last looked, 404: file was deleted
+                if e.status in (404, 409, 422):
+                    raise PushConflict(path, e.status) from e
+                raise
+            finally:
+                self._record_rate_limit()
+            self._shas[path] = result["content"].sha
+            logger.info(f"{path} {'created' if sha is None else 'updated'} on GitHub")
+
+    # Delete a file; a file that is already gone is not an error
+    def delete_file(self, path, message):
+        from github import GithubException
+        with self.lock:
+            if path not in self._shas:
+                self._fetch(path)
+            for attempt in range(2):
+                sha = self._shas.get(path)
+                if sha is None:
+                    return
+                self._check_rate_limit()
+                try:
+                    self._repo.delete_file(path=path, message=message, sha=sha, branch=self._branch)
+                except GithubException as e:
+                    if attempt == 0 and e.status in (404, 409, 422):
+                        self._fetch(path)
+                        continue
+                    raise
+                finally:
+                    self._record_rate_limit()
+                self._shas.pop(path, None)
+                logger.info(f"{path} deleted on GitHub")
+                return
+
+@st.cache_resource
+def get_github_client():
+    return GithubRepoClient(get_setting("GITHUB_TOKEN"))
+
+# Pushes changed log files to GitHub off the Streamlit script thread.
+# Saves only record the file name in a durable on-disk outbox; the worker
+# debounces bursts of saves into one commit per file, reads the current file
+# contents at push time and retries with exponential backoff while GitHub is
+# unreachable. Entries are removed from the outbox only after a successful
+# push, so queued changes survive a container restart.
+class GithubSyncWorker:
+    def __init__(self, client, outbox_path=SYNC_OUTBOX_PATH, exporters=None, bootstrap=None, stores=()):
+        self._client = client
+        self._exporters = exporters or {}
+        self._stores = list(stores)
+        self._bootstrap = bootstrap
+        self._outbox_path = outbox_path
+        self._wake = threading.Event()
+        self._retry_at = None
+        self._backoff = 0
+        self.last_synced = None
+        self.last_error = None
+        self._thread = threading.Thread(target=self._run, name="github-sync", daemon=True)
+        self._thread.start()
+
+    def _read_outbox(self):
+        try:
+            with open(self._outbox_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            logger.error(f"Corrupt sync outbox {self._outbox_path}: {e}")
+            return {}
+
+    def _write_outbox(self, outbox):
+        directory = os.path.dirname(os.path.abspath(self._outbox_path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".outbox.", suffix=".tmp", dir=directory)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(outbox, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._outbox_path)
+
+    def enqueue(self, repo_path, message):
+        now = time.time()
+        with locked_log(self._outbox_path):
+            outbox = self._read_outbox()
+            entry = outbox.setdefault(repo_path, {"messages": [], "seq": 0, "queued_at": now})
+            entry["messages"].append(message)
+            entry["seq"] += 1
+            entry["updated_at"] = now
+            self._write_outbox(outbox)
+        self._wake.set()
+
+    def status(self):
+        with locked_log(self._outbox_path):
+            outbox = self._read_outbox()
+        return {
+            'pending': sorted(outbox),
+            'changes': sum(len(entry["messages"]) for entry in outbox.values()),
+            'last_synced': self.last_synced,
+            'last_error': self.last_error,
+            'retry_at': self._retry_at,
+        }
+
+    # Push the file's current contents over the remote blob it was last read
+    # or written as; a file removed locally is deleted remotely. Read under
+    # the file's lock, so a save appending to it cannot leave a half-written
+    # last line in the pushed copy. If another app instance pushed the file
+    # in between, its changes are merged in and the push is tried again.
+    def _push_file(self, repo_path, message):
+        for attempt in range(SYNC_CONFLICT_RETRIES):
+            # Logs kept in SQLite are written out to their CSV just before the push
+            if repo_path in self._exporters:
+                self._exporters[repo_path]()
+            # Taken before the read: a merge made after it fails the push
+            # instead of being overwritten
+            sha = self._client.known_sha(repo_path)
+            try:
+                with locked_log(repo_path), open(repo_path, "rb") as file:
+                    content = file.read()
+            except FileNotFoundError:
+                self._client.delete_file(repo_path, message)
+                return
+            try:
+                self._client.put_file(repo_path, content, message, sha)
+                return
+            except PushConflict as e:
+                conflict = e
+                logger.info(f"{e}; merging it before pushing again")
+                self._merge_remote(repo_path)
+        raise conflict
+
+    # Merge the current remote copy of a file into the log that owns it
+    # (reading it also records its SHA for the next push)
+    def _merge_remote(self, repo_path):
+        data = self._client.get_files([repo_path])[repo_path]
+        if isinstance(data, Exception):
+            raise data
+        if data is None:
+            return
+        store = next((store for store in self._stores if store.owns(repo_path)), None)
+        if store is None:
+            logger.warning(f"No log owns {repo_path}; its remote copy is overwritten")
+            return
+        text = (gzip.decompress(data) if repo_path.endswith(".gz") else data).decode('utf-8')
+        if text.strip():
+            count = store.merge_remote(repo_path, text)
+            logger.info(f"Merged {count} remote change(s) from {repo_path}")
+
+    def _flush(self, outbox):
+        for repo_path, entry in outbox.items():
+            messages = entry["messages"]
+            message = messages[0] if len(messages) == 1 else f"Updated {repo_path} ({len(messages)} changes)"
+            # Never push over a remote file this process could not read
+            if self._bootstrap is not None and self._bootstrap.remote_unknown(repo_path):
+                raise RemoteLogUnavailable(repo_path, "not pushed until it can be fetched")
+            self._push_file(repo_path, message)
+            with locked_log(self._outbox_path):
+                current = self._read_outbox()
+                # Saves that arrived during the push stay queued for the next commit
+                if current.get(repo_path, {}).get("seq") == entry["seq"]:
+                    del current[repo_path]
+                    self._write_outbox(current)
+
+    def _run(self):
+        while True:
+            with locked_log(self._outbox_path):
+                outbox = self._read_outbox()
+            if not outbox:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            now = time.time()
+            newest = max(entry["updated_at"] for entry in outbox.values())
+            oldest = min(entry["queued_at"] for entry in outbox.values())
+            due = min(newest + SYNC_DEBOUNCE_SECONDS, oldest + SYNC_MAX_DELAY_SECONDS)
+            if self._retry_at is not None:
+                due = max(due, self._retry_at)
+            if now < due:
+                self._wake.wait(due - now)
+                self._wake.clear()
+                continue
+            try:
+                self._flush(outbox)
+                self.last_synced = time.time()
+                self.last_error = None
+                self._backoff = 0
+                self._retry_at = None
+            except Exception as e:
+                self._backoff = min(max(self._backoff * 2, SYNC_DEBOUNCE_SECONDS), SYNC_MAX_BACKOFF_SECONDS)
+                self._retry_at = time.time() + self._backoff
+                if isinstance(e, GithubRateLimited):
+                    self._retry_at = max(self._retry_at, e.reset_at)
+                self.last_error = str(e)
+                logger.error(f"Failed to push to GitHub, retrying in {self._backoff}s: {e}")
+
+# One sync worker per server process, shared by all sessions
+@st.cache_resource
+def get_sync_worker():
+    exporters = {store.path: store.export_csv for store in get_log_stores().values() if hasattr(store, 'export_csv')}
+    return GithubSyncWorker(get_github_client(), exporters=exporters, bootstrap=get_log_bootstrap(), stores=get_log_stores().values())
+
+# Queue a log file for the next GitHub push; returns immediately
+def queue_github_sync(repo_path, message):
+    get_sync_worker().enqueue(repo_path, message)
+
+LOG_PATHS = ["incident_log.csv", "happenings_log.csv"]
+REMOTE_MISSING_TTL_SECONDS = 600
+
+# Cold start: log files missing on disk are fetched from GitHub at the same
+# time, once per process, before any store reads them. `trees` are
+# directories (the monthly partitions) whose every file is fetched the same
+# way, after one listing request each. A file GitHub does not have is
+# remembered for REMOTE_MISSING_TTL_SECONDS, so a reader that finds it
+# missing on disk does not ask again on every rerun. Failed requests are not
+# remembered and are retried by the next reader.
+class LogBootstrap:
+    def __init__(self, client, paths, trees=(), missing_ttl=REMOTE_MISSING_TTL_SECONDS):
+        self._client = client
+        self._missing_ttl = missing_ttl
+        self._lock = threading.Lock()
+        self._missing = {}  # path -> when GitHub last said it does not exist
+        self._trees = {}    # directory -> the files GitHub has in it
+        self._failed = set()  # paths whose last fetch raised
+        self.fetched = []
+        if client.configured:
+            for directory in trees:
+                try:
+                    self._list_tree(directory)
+                except Exception as e:
+                    logger.error(f"Listing {directory} on GitHub failed: {e}")
+            self._fetch_missing(list(paths) + [path for files in self._trees.values() for path in files])
+
+    def _list_tree(self, directory):
+        files = self._client.list_dir(directory) or []
+        with self._lock:
+            self._trees[directory] = files
+        return files
+
+    # Returns the paths whose request failed
+    def _fetch_missing(self, paths):
+        paths = [path for path in dict.fromkeys(paths) if not (os.path.exists(path) and os.path.getsize(path) > 0)]
+        if not paths:
+            return []
+        failed = []
+        for path, result in self._client.get_files(paths).items():
+            with self._lock:
+                if isinstance(result, Exception):
+                    self._failed.add(path)
+                else:
+                    self._failed.discard(path)
+            if isinstance(result, Exception):
+                logger.error(f"Fetching {path} from GitHub failed: {result}")
+                failed.append(path)
+            elif result is None:
+                self._remember_missing(path)
+            else:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                with locked_log(path):
+                    if not os.path.exists(path) or os.path.getsize(path) == 0:
+                        write_bytes_atomic(path, result)
+                self.fetched.append(path)
+        logger.info(f"Bootstrap fetched {self.fetched or 'nothing'}; not on GitHub: {sorted(self._missing)}")
+        return failed
+
+    # Put every file GitHub has under `directory`, and the `extra` paths it
+    # has, on disk. Returns False if GitHub has nothing in `directory`.
+    # Raises when GitHub cannot be asked, so an unreachable repository is
+    # never taken for an empty one.
+    def restore_tree(self, directory, extra=()):
+        if not self._client.configured:
+            return False
+        with self._lock:
+            files = self._trees.get(directory)
+        if files is None:
+            try:
+                files = self._list_tree(directory)
+            except Exception as e:
+                raise RemoteLogUnavailable(directory, e) from e
+        if not files:
+            return False
+        failed = self._fetch_missing(files + list(extra))
+        if failed:
+            raise RemoteLogUnavailable(", ".join(failed), "request failed")
+        return True
+
+    # Files under `directory` GitHub listed but the last fetch failed for
+    def incomplete(self, directory):
+        prefix = os.path.join(directory, "")
+        with self._lock:
+            return any(path.startswith(prefix) for path in self._failed)
+
+    # The last attempt to fetch `path` failed, so its remote state is unknown
+    def remote_unknown(self, path):
+        with self._lock:
+            return path in self._failed
+
+    # The change poller has read (and merged) the remote copy of `path`
+    def mark_known(self, path):
+        with self._lock:
+            self._failed.discard(path)
+
+    def _remember_missing(self, path):
+        with self._lock:
+            self._missing[path] = time.time()
+
+    # The file's text from GitHub, or None if it does not exist there (or no
+    # repository is configured); a recent "does not exist" is answered
+    # without a request. Raises RemoteLogUnavailable if GitHub cannot be asked.
+    def fetch(self, path):
+        if not self._client.configured:
+            return None
+        with self._lock:
+            missing_at = self._missing.get(path)
+        if missing_at is not None and time.time() - missing_at < self._missing_ttl:
+            return None
+        try:
+            text = self._client.get_file(path)
+        except Exception as e:
+            with self._lock:
+                self._failed.add(path)
+            raise RemoteLogUnavailable(path, e) from e
+        with self._lock:
+            self._failed.discard(path)
+        if text is None:
+            self._remember_missing(path)
+        else:
+            with self._lock:
+                self._missing.pop(path, None)
+        return text
+
+# Runs in the script thread before the log stores are built, since the
+# SQLite and partitioned stores import the fetched CSVs when created
+@st.cache_resource
+def get_log_bootstrap():
+    paths = LOG_PATHS + [tombstone_path(path) for path in LOG_PATHS]
+    trees = []
+    if get_setting("STORAGE_BACKEND", "csv") == "partitioned":
+        trees = [partition_dir(path) for path in LOG_PATHS]
+        paths += [partition_tombstone_path(path) for path in LOG_PATHS]
+    return LogBootstrap(get_github_client(), paths, trees)
+
+# Map legacy column names and coerce types of a raw incident log frame
+def normalize_incident_log(df):
+    df.columns = df.columns.str.strip()
+    column_mapping = {
+        'BLOK': 'Block',
+        'Opvoeder betrokke': 'Teacher',
+        'Wat het gebeur': 'Incident',
+        'Kategorie': 'Category',
+        'Leerder Naam': 'Learner_Full_Name',
+        'Kommentaar': 'Comment',
+        'Datum': 'Date'
+    }
+    df = df.rename(columns=column_mapping)
+    expected_columns = INCIDENT_COLUMNS
+    if 'Id' not in df.columns:
+        df['Id'] = None
+    for col in expected_columns:
+        if col not in df.columns:
+            df[col] = 'Onbekend2999' if col != 'Date' else pd.NaT
+    df['Category'] = pd.to_numeric(df['Category'], errors='coerce').fillna(1).astype(int).astype(str)
+    return fill_entry_ids(compact_log_frame(df[expected_columns]))
+
+# Load or initialize incident log
+def read_incident_log():
+    try:
+        if os.path.exists("incident_log.csv") and os.path.getsize("incident_log.csv") > 0:
+            snapshot = read_parquet_snapshot("incident_log.csv")
+            if is_log_snapshot(snapshot, INCIDENT_COLUMNS):
+                return snapshot
+            stamp = _file_stamp("incident_log.csv")
+            df = normalize_incident_log(pd.read_csv("incident_log.csv"))
+            write_parquet_snapshot("incident_log.csv", df, stamp)
+            return df
+        else:
+            content = get_log_bootstrap().fetch("incident_log.csv")
+            if content is None:
+                logger.warning("incident_log.csv does not exist in GitHub repository. Initializing empty DataFrame.")
+                df = pd.DataFrame(columns=INCIDENT_COLUMNS)
+            else:
+                df = pd.read_csv(io.StringIO(content))
+                df.to_csv("incident_log.csv", index=False)
+                logger.info("Incident log fetched from GitHub and saved locally")
+
+        return normalize_incident_log(df)
+    # Not an empty log: the store must not cache or extend it
+    except RemoteLogUnavailable:
+        raise
+    except Exception as e:
+        logger.error(f"Error loading incident_log.csv: {e}")
+        return normalize_incident_log(pd.DataFrame(columns=INCIDENT_COLUMNS))
+
+# Map legacy column names and coerce types of a raw happenings log frame
+def normalize_happenings_log(df):
+    df.columns = df.columns.str.strip()
+    column_mapping = {
+        'Leerder Naam': 'Learner_Full_Name',
+        'BLOK': 'Block',
+        'Gebeurtenis': 'Event',
+        'Kommentaar': 'Comment',
+        'Datum': 'Date'
+    }
+    df = df.rename(columns=column_mapping)
+    expected_columns = HAPPENING_COLUMNS
+    if 'Id' not in df.columns:
+        df['Id'] = None
+    for col in expected_columns:
+        if col not in df.columns:
+            df[col] = 'Onbekend2999' if col != 'Date' else pd.NaT
+    return fill_entry_ids(compact_log_frame(df[expected_columns]))
+
+# Load or initialize general happenings log
+def read_happenings_log():
+    try:
+        if os.path.exists("happenings_log.csv") and os.path.getsize("happenings_log.csv") > 0:
+            snapshot = read_parquet_snapshot("happenings_log.csv")
+            if is_log_snapshot(snapshot, HAPPENING_COLUMNS):
+                return snapshot
+            stamp = _file_stamp("happenings_log.csv")
+            df = normalize_happenings_log(pd.read_csv("happenings_log.csv"))
+            write_parquet_snapshot("happenings_log.csv", df, stamp)
+            return df
+        else:
+            content = get_log_bootstrap().fetch("happenings_log.csv")
+            if content is None:
+                logger.warning("happenings_log.csv does not exist in GitHub repository. Initializing empty DataFrame.")
+                df = pd.DataFrame(columns=HAPPENING_COLUMNS)
+            else:
+                df = pd.read_csv(io.StringIO(content))
+                df.to_csv("happenings_log.csv", index=False)
+                logger.info("Happenings log fetched from GitHub and saved locally")
+
+        return normalize_happenings_log(df)
+    # Not an empty log: the store must not cache or extend it
+    except RemoteLogUnavailable:
+        raise
+    except Exception as e:
+        logger.error(f"Error loading happenings_log.csv: {e}")
+        return normalize_happenings_log(pd.DataFrame(columns=HAPPENING_COLUMNS))
+
+SQLITE_PATH = "hostel.db"
+
+# SQLite column names ignore case, so an entry's Id cannot share the rowid's name
+def _sql_column(col):
+    return "Entry_Id" if col == 'Id' else col
+
+# SQLite storage for one log (STORAGE_BACKEND = "sqlite"). The database runs
+# in WAL mode so readers never block the writer, rows get a stable INTEGER
+# PRIMARY KEY, and Learner_Full_Name, Date, Category and Id are indexed so
+# lookups do not scan the table. Clears are tombstones in <log>_deleted.csv,
+# as with the CSV backend; compaction deletes the rows once the undo window
+# has passed. A trigger-maintained counter in log_versions lets every
+# process see that the table changed with a single-row read. The CSV stays
+# the GitHub record: the sync worker calls export_csv() before pushing.
+# On first use an empty table is filled from the existing CSV (one-shot).
+class SqliteLogStore(LogStore):
+    def __init__(self, db_path, table, csv_path, columns, csv_reader, normalizer):
+        super().__init__(csv_path, columns, normalizer, tombstone_path(csv_path))
+        self.db_path = db_path
+        self.table = table
+        self.location = f"{db_path}:{table}"
+        self._csv_reader = csv_reader
+        self._local = threading.local()
+        self._id_index = None  # (frame, Index of its Ids)
+        self._create_schema()
+        self._import_csv_once()
+        self._store_legacy_ids()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _create_schema(self):
+        table = self.table
+        column_defs = ", ".join(f'"{_sql_column(col)}" TEXT' for col in self.columns)
+        with self._transaction() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS log_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL, imported INTEGER NOT NULL DEFAULT 0)")
+            conn.execute("INSERT OR IGNORE INTO log_versions (name, version) VALUES (?, 0)", (table,))
+            conn.execute(f'CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY AUTOINCREMENT, {column_defs})')
+            # Databases created before entries had Ids
+            existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            if "Entry_Id" not in existing:
+                conn.execute(f'ALTER TABLE {table} ADD COLUMN "Entry_Id" TEXT')
+            conn.execute(f'CREATE INDEX IF NOT EXISTS {table}_entry_id ON {table} ("Entry_Id")')
+            conn.execute(f'CREATE INDEX IF NOT EXISTS {table}_learner ON {table} ("Learner_Full_Name")')
+            conn.execute(f'CREATE INDEX IF NOT EXISTS {table}_date ON {table} ("Date")')
+            if 'Category' in self.columns:
+                conn.execute(f'CREATE INDEX IF NOT EXISTS {table}_category ON {table} ("Category")')
+            for event in ("INSERT", "UPDATE", "DELETE"):
+                conn.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_version AFTER {event} ON {table} "
+                    f"BEGIN UPDATE log_versions SET version = version + 1 WHERE name = '{table}'; END"
+                )
+
+    def _import_csv_once(self):
+        with self._transaction() as conn:
+            imported, = conn.execute("SELECT imported FROM log_versions WHERE name = ?", (self.table,)).fetchone()
+            if imported:
+                return
+            rows = self._csv_reader() if os.path.exists(self.path) else pd.DataFrame(columns=self.columns)
+            self._insert(conn, rows)
+            conn.execute("UPDATE log_versions SET imported = 1 WHERE name = ?", (self.table,))
+        logger.info(f"Imported {len(rows)} rows from {self.path} into {self.location}")
+
+    # Give rows imported before entries had Ids the same Ids the CSV would
+    def _store_legacy_ids(self):
+        with self._transaction() as conn:
+            rows = pd.read_sql_query(f'SELECT id, {self._select_list()} FROM {self.table} WHERE "Entry_Id" IS NULL ORDER BY {self.table}.id', conn)
+            if rows.empty:
+                return
+            row_ids = rows.pop('id').tolist()
+            entry_ids = self._normalizer(rows)['Id'].tolist()
+            conn.executemany(f'UPDATE {self.table} SET "Entry_Id" = ? WHERE id = ?', zip(entry_ids, row_ids))
+        logger.info(f"Stored Ids for {len(row_ids)} existing rows of {self.location}")
+
+    def _select_list(self):
+        return ", ".join(f'"{_sql_column(col)}" AS "{col}"' for col in self.columns)
+
+    def _insert(self, conn, rows):
+        records = rows[self.columns].astype(object).where(rows[self.columns].notna(), None)
+        dates = pd.to_datetime(rows['Date'], errors='coerce')
+        records['Date'] = dates.dt.strftime("%Y-%m-%d").astype(object).where(dates.notna(), None).to_numpy()
+        quoted = ", ".join(f'"{_sql_column(col)}"' for col in self.columns)
+        placeholders = ", ".join("?" for _ in self.columns)
+        conn.executemany(f"INSERT INTO {self.table} ({quoted}) VALUES ({placeholders})", records.itertuples(index=False, name=None))
+
+    def _read_table(self):
+        return pd.read_sql_query(f'SELECT {self._select_list()} FROM {self.table} ORDER BY {self.table}.id', self._connect())
+
+    def _source_stamp(self):
+        return self._connect().execute("SELECT version FROM log_versions WHERE name = ?", (self.table,)).fetchone()[0]
+
+    def _read(self):
+        return self._normalizer(self._read_table())
+
+    # Runs inside the IMMEDIATE transaction _write_lock() opened on this
+    # thread's connection; new rows always get the highest ids
+    def _write(self, rows):
+        self._insert(self._connect(), rows)
+        return True
+
+    def _drop(self, ids):
+        self._connect().executemany(f'DELETE FROM {self.table} WHERE "Entry_Id" = ?', [(entry_id,) for entry_id in ids])
+        return [self.path]
+
+    # No other process can write the table between the staleness check and the save
+    def _write_lock(self):
+        return self._transaction()
+
+    # Rows an indexed lookup finds, as a slice of the shared frame
+    def _rows_for(self, where, params):
+        with self._lock:
+            df = self.get()
+            if self._id_index is None or self._id_index[0] is not df:
+                self._id_index = (df, pd.Index(df['Id']))
+            cursor = self._connect().execute(f'SELECT "Entry_Id" FROM {self.table} WHERE {where}', params)
+            positions = self._id_index[1].get_indexer_for([row[0] for row in cursor])
+            # Cleared rows, and rows another process committed after our
+            # last get(), are not in the frame
+            return df.iloc[np.sort(positions[positions >= 0])]
+
+    def rows_on_date(self, day):
+        return self._rows_for('"Date" = ?', (pd.Timestamp(day).strftime("%Y-%m-%d"),))
+
+    def rows_between(self, start, end):
+        return self._rows_for('"Date" BETWEEN ? AND ?', (pd.Timestamp(start).strftime("%Y-%m-%d"), pd.Timestamp(end).strftime("%Y-%m-%d")))
+
+    # Write the table to its CSV (the GitHub record); cleared entries stay
+    # in it until compaction, as in the CSV backend
+    def export_csv(self):
+        df = self._read_table()
+        with locked_log(self.path):
+            write_log_atomic(self.path, df)
+
+PARTITION_ROOT = "logs"
+UNDATED_PARTITION = "undated"
+
+# logs/<log>/ holds a log's partitions, logs/<log>_deleted.csv its tombstones
+def partition_dir(log_path):
+    return os.path.join(PARTITION_ROOT, os.path.splitext(os.path.basename(log_path))[0])
+
+def partition_tombstone_path(log_path):
+    return partition_dir(log_path) + "_deleted.csv"
+
+# Partition key ('YYYY-MM', or 'undated') for each row of a log frame
+def _partition_keys(rows):
+    dates = pd.to_datetime(rows['Date'], errors='coerce')
+    return dates.dt.strftime("%Y-%m").astype(object).where(dates.notna(), UNDATED_PARTITION)
+
+def _current_month():
+    return datetime.now(pytz.timezone('Africa/Johannesburg')).strftime("%Y-%m")
+
+# Month-partitioned CSV storage for one log (STORAGE_BACKEND = "partitioned").
+# Each month lives in logs/<log>/<YYYY-MM>.csv; once a month has closed, its
+# file is gzipped to <YYYY-MM>.csv.gz (and the plain file removed, locally
+# and on GitHub) and is no longer appended to. Saves and pushes touch only
+# the current month's file, each partition is re-parsed only when its own
+# file changes, and date-range reads open only the months in range. Rows
+# without a date live in undated.csv. Clears are tombstones in
+# logs/<log>_deleted.csv, so clearing an old entry never rewrites an archive
+# until compaction.
+# On first use an existing single-file log is split into partitions (unless
+# GitHub already has them); the original CSV is left as it was.
+class PartitionedLogStore(LogStore):
+    def __init__(self, legacy_path, columns, legacy_reader, normalizer, sync=None):
+        super().__init__(legacy_path, columns, normalizer, partition_tombstone_path(legacy_path))
+        self.dir = partition_dir(legacy_path)
+        self.location = self.dir
+        self._legacy_reader = legacy_reader
+        self._sync = sync
+        self._parts = {}  # key -> (path, stamp, frame)
+        self._migrated = False
+        self._archived_month = None
+
+    def _queue_sync(self, path, message):
+        if self._sync is not None:
+            self._sync(path, message)
+
+    def _hot_path(self, key):
+        return os.path.join(self.dir, key + ".csv")
+
+    # Where rows for a partition go; a closed month is always written as an archive
+    def _target_path(self, key, files):
+        if key in files:
+            return files[key]
+        path = self._hot_path(key)
+        if key != UNDATED_PARTITION and key < _current_month():
+            path += ".gz"
+        return path
+
+    # key -> file; an archive wins over a plain file left behind by a crash
+    def _partition_files(self):
+        files = {}
+        try:
+            entries = list(os.scandir(self.dir))
+        except FileNotFoundError:
+            return files
+        for entry in entries:
+            if entry.name.endswith(".csv.gz"):
+                files[entry.name[:-len(".csv.gz")]] = entry.path
+            elif entry.name.endswith(".csv"):
+                files.setdefault(entry.name[:-len(".csv")], entry.path)
+        return files
+
+    # Undated rows first, then months in order, so the current month is last
+    @staticmethod
+    def _ordered(keys):
+        return sorted(keys, key=lambda key: (key != UNDATED_PARTITION, key))
+
+    def _prepare(self):
+        if not self._migrated:
+            self._migrate_legacy()
+            self._migrated = True
+        month = _current_month()
+        if self._archived_month != month:
+            self._archive_closed(month)
+            self._archived_month = month
+
+    # A fresh disk takes the partitions another instance already pushed; the
+    # single-file log is split only when GitHub has none, since it stops
+    # being updated once a log is partitioned
+    def _migrate_legacy(self):
+        bootstrap = get_log_bootstrap()
+        # Partitions whose cold-start fetch failed are fetched again first
+        if self._partition_files() and not bootstrap.incomplete(self.dir):
+            return
+        os.makedirs(self.dir, exist_ok=True)
+        if bootstrap.restore_tree(self.dir, [self._tombstones.path]) or self._partition_files():
+            return
+        if not os.path.exists(self.path):
+            return
+        legacy = self._legacy_reader()
+        for key, rows in legacy.groupby(_partition_keys(legacy), sort=True):
+            path = self._hot_path(key)
+            with locked_log(path):
+                write_log_atomic(path, rows)
+            self._queue_sync(path, f"Split {self.path} into monthly partitions")
+        if os.path.exists(tombstone_path(self.path)):
+            with open(tombstone_path(self.path), "rb") as f:
+                write_bytes_atomic(self._tombstones.path, f.read())
+            self._queue_sync(self._tombstones.path, f"Split {self.path} into monthly partitions")
+        logger.info(f"Split {len(legacy)} rows of {self.path} into {self.dir}")
+
+    def _archive_closed(self, current_month):
+        for key, path in self._partition_files().items():
+            if key == UNDATED_PARTITION or key >= current_month or path.endswith(".gz"):
+                continue
+            archive = path + ".gz"
+            with locked_log(path):
+                with open(path, "rb") as f:
+                    write_bytes_atomic(archive, gzip.compress(f.read(), mtime=0))
+                os.remove(path)
+            self._parts.pop(key, None)
+            self._queue_sync(archive, f"Archived {path}")
+            self._queue_sync(path, f"Archived {path}")
+            logger.info(f"Archived closed partition {path}")
+
+    def _load_part(self, key, path):
+        stamp = _file_stamp(path)
+        cached = self._parts.get(key)
+        if cached is not None and cached[0] == path and cached[1] == stamp:
+            return cached[2]
+        frame = self._normalizer(pd.read_csv(path))
+        self._parts[key] = (path, stamp, frame)
+        return frame
+
+    def _combine(self, frames):
+        if not frames:
+            return self._normalizer(pd.DataFrame(columns=self.columns))
+        if len(frames) == 1:
+            return frames[0].reset_index(drop=True)
+        return compact_log_frame(pd.concat(frames, ignore_index=True))
+
+    def _source_stamp(self):
+        files = self._partition_files()
+        return tuple((key, _file_stamp(files[key])) for key in self._ordered(files))
+
+    def _read(self):
+        files = self._partition_files()
+        return self._combine([self._load_part(key, files[key]) for key in self._ordered(files)])
+
+    # Each partition is locked on its own while it is written
+    def _write(self, rows):
+        files = self._partition_files()
+        last_key = self._ordered(files)[-1] if files else None
+        keys = _partition_keys(rows)
+        for key, part_rows in rows.groupby(keys, sort=True):
+            path = self._target_path(key, files)
+            old_stamp = _file_stamp(path)
+            os.makedirs(self.dir, exist_ok=True)
+            with locked_log(path):
+                if path.endswith(".gz"):
+                    # Late entry for a closed month: rewrite its archive
+                    existing = self._load_part(key, path) if os.path.exists(path) else None
+                    write_log_atomic(path, part_rows if existing is None else concat_log_frames(existing, part_rows))
+                else:
+                    append_log_rows(path, part_rows, self.columns, lambda: self._normalizer(pd.read_csv(path)))
+            cached = self._parts.get(key)
+            if cached is not None and cached[1] == old_stamp:
+                self._parts[key] = (path, _file_stamp(path), concat_log_frames(cached[2], part_rows))
+        # Rows that all land in the last partition extend the combined frame
+        touched = set(keys)
+        key = next(iter(touched))
+        return len(touched) == 1 and (last_key is None or self._ordered([key, last_key])[-1] == key)
+
+    # Rewrites only the partitions (archives included) that hold the entries
+    def _drop(self, ids):
+        written = []
+        for key, path in self._partition_files().items():
+            with locked_log(path):
+                frame = self._load_part(key, path)
+                keep = ~frame['Id'].isin(list(ids))
+                if keep.all():
+                    continue
+                frame = frame[keep].reset_index(drop=True)
+                write_log_atomic(path, frame)
+            self._parts[key] = (path, _file_stamp(path), frame)
+            written.append(path)
+        return written
+
+    # Reads only the months in range. When the combined frame is already
+    # loaded the rows are sliced from it and keep their position in the log.
+    def rows_between(self, start, end):
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        with self._lock:
+            self._prepare()
+            if self._is_current():
+                df = self._df
+            else:
+                files = self._partition_files()
+                first, last = start.strftime("%Y-%m"), end.strftime("%Y-%m")
+                keys = [key for key in self._ordered(files) if key != UNDATED_PARTITION and first <= key <= last]
+                df = drop_deleted(self._combine([self._load_part(key, files[key]) for key in keys]), self._tombstones.hidden())
+            return df[df['Date'].between(start, end)]
+
+    def rows_on_date(self, day):
+        return self.rows_between(day, day)
+
+    def written_paths(self, rows):
+        files = self._partition_files()
+        return [self._target_path(key, files) for key in sorted(set(_partition_keys(rows)))]
+
+    # Other app instances write new entries to the current month (closed
+    # months only change on compaction, which drops cleared entries anyway)
+    def remote_paths(self):
+        return [self._hot_path(_current_month()), self._tombstones.path]
+
+    # Any partition, closed months included
+    def owns(self, path):
+        return path == self._tombstones.path or path.startswith(os.path.join(self.dir, ""))
+
+# Both logs, shared by all sessions and reloaded only when they change.
+# STORAGE_BACKEND = "sqlite" keeps them in SQLITE_PATH instead of the CSVs,
+# "partitioned" splits them into monthly files under PARTITION_ROOT.
+@st.cache_resource
+def get_log_stores():
+    backend = get_setting("STORAGE_BACKEND", "csv")
+    if backend == "partitioned":
+        return {
+            'incident': PartitionedLogStore("incident_log.csv", INCIDENT_COLUMNS, read_incident_log, normalize_incident_log, queue_github_sync),
+            'happenings': PartitionedLogStore("happenings_log.csv", HAPPENING_COLUMNS, read_happenings_log, normalize_happenings_log, queue_github_sync),
+        }
+    if backend == "sqlite":
+        return {
+            'incident': SqliteLogStore(SQLITE_PATH, 'incidents', "incident_log.csv", INCIDENT_COLUMNS, read_incident_log, normalize_incident_log),
+            'happenings': SqliteLogStore(SQLITE_PATH, 'happenings', "happenings_log.csv", HAPPENING_COLUMNS, read_happenings_log, normalize_happenings_log),
+        }
+    return {
+        'incident': CsvLogStore("incident_log.csv", INCIDENT_COLUMNS, read_incident_log, normalize_incident_log),
+        'happenings': CsvLogStore("happenings_log.csv", HAPPENING_COLUMNS, read_happenings_log, normalize_happenings_log),
+    }
+
+COMPACT_INTERVAL_SECONDS = 600
+
+# Background thread that drops cleared entries from the log files once their
+# undo window has passed, so the log files do not keep them forever, and
+# queues the rewritten files for GitHub. One per process.
+class LogCompactor:
+    def __init__(self, stores, sync, interval=COMPACT_INTERVAL_SECONDS):
+        self._stores = stores
+        self._sync = sync
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="log-compactor", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            self.compact_once()
+
+    def compact_once(self):
+        cutoff = time.time() - UNDO_SECONDS
+        for store in self._stores:
+            try:
+                for path in store.compact(cutoff):
+                    self._sync(path, f"Compacted {path}")
+            except Exception as e:
+                logger.error(f"Compacting {store.location} failed: {e}")
+
+@st.cache_resource
+def get_log_compactor():
+    return LogCompactor(list(get_log_stores().values()), queue_github_sync)
+
+REMOTE_POLL_SECONDS = 15
+
+# Background thread that keeps this process in step with other app instances
+# (or a restarted container) writing to the same GitHub repository. Each
+# round sends one conditional request per log file; only a file whose blob
+# changed is downloaded and merged into its store, which bumps the store's
+# version so open pages refresh. One per process.
+class RemoteChangePoller:
+    def __init__(self, client, stores, interval=REMOTE_POLL_SECONDS, bootstrap=None):
+        self._client = client
+        self._stores = stores
+        self._bootstrap = bootstrap
+        self._interval = interval
+        self._etags = {}
+        self._stop = threading.Event()
+        self.last_polled = None
+        self.last_error = None
+        self._thread = threading.Thread(target=self._run, name="remote-poller", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            self.poll_once()
+
+    def poll_once(self):
+        if not self._client.configured:
+            return
+        try:
+            for store in self._stores:
+                for path in store.remote_paths():
+                    self._poll_path(store, path)
+            self.last_polled = time.time()
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Polling GitHub for changes failed: {e}")
+
+    # Only the download holds the client lock: the client lock is never held
+    # while a store or log file lock is taken, since reading a log may itself
+    # fetch it from GitHub. A push between the download and remember_sha()
+    # is safe: the next push over the older SHA conflicts and merges first.
+    def _poll_path(self, store, path):
+        etag, sha, text = self._client.poll_file(path, self._etags.get(path))
+        if text is not None:
+            count = store.merge_remote(path, text) if text.strip() else 0
+            if count:
+                logger.info(f"Merged {count} remote change(s) from {path}")
+                store.get()
+            self._client.remember_sha(path, sha)
+        self._etags[path] = etag
+        if self._bootstrap is not None:
+            self._bootstrap.mark_known(path)
+
+@st.cache_resource
+def get_remote_poller():
+    return RemoteChangePoller(get_github_client(), list(get_log_stores().values()), bootstrap=get_log_bootstrap())
+
+def load_incident_log():
+    return get_log_stores()['incident'].get()
+
+def load_happenings_log():
+    return get_log_stores()['happenings'].get()
+
+# (category, count above which the sanction applies, sanction)
+SANCTION_RULES = [
+    ('1', 5, 'Waarskuwing en ouerberaad met hosteltoesighouer.'),
+    ('2', 3, 'Tydelike verbod op hostelaktiwiteite.'),
+    ('3', 2, 'Ouers moet afspraak maak met hostelbestuur.'),
+    ('4', 0, 'Verwysing na dissiplinêre komitee.'),
+]
+SANCTION_CATEGORIES = [category for category, _, _ in SANCTION_RULES]
+
+# Incidents per learner (rows) and category (columns)
+def _category_tally(rows):
+    if rows.empty:
+        return pd.DataFrame(0, index=pd.Index([], name='Learner_Full_Name'), columns=SANCTION_CATEGORIES)
+    tally = pd.crosstab(rows['Learner_Full_Name'].astype(str), rows['Category'].astype(str))
+    return tally.reindex(columns=SANCTION_CATEGORIES, fill_value=0)
+
+# Per-learner, per-category incident counters kept in step with the incident
+# store. Saves and clears adjust only the affected learners' counters; the
+# thresholds are evaluated as one mask per category over the counter table,
+# so the cost depends on the number of learners, not on the log's history.
+class SanctionEngine:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = _category_tally(pd.DataFrame())
+        self._sanctions = None
+
+    def reset(self, df):
+        with self._lock:
+            self._counts = _category_tally(df)
+            self._sanctions = None
+
+    def append(self, rows):
+        with self._lock:
+            self._counts = self._counts.add(_category_tally(rows), fill_value=0).astype(int)
+            self._sanctions = None
+
+    def remove(self, rows):
+        with self._lock:
+            counts = self._counts.sub(_category_tally(rows), fill_value=0).astype(int)
+            self._counts = counts[counts.any(axis=1)]
+            self._sanctions = None
+
+    # One row per (learner, category) over its threshold, ordered by learner
+    def sanctions(self):
+        with self._lock:
+            if self._sanctions is None:
+                frames = []
+                for category, threshold, sanction in SANCTION_RULES:
+                    counts = self._counts[category]
+                    hits = counts[counts > threshold]
+                    frames.append(pd.DataFrame({
+                        'Learner': hits.index,
+                        'Category': category,
+                        'Count': hits.to_numpy(dtype=int),
+                        'Sanction': sanction
+                    }))
+                self._sanctions = (
+                    pd.concat(frames, ignore_index=True)
+                    .sort_values(['Learner', 'Category'], kind='stable')
+                    .reset_index(drop=True)
+                )
+            return self._sanctions
+
+@st.cache_resource
+def get_sanction_engine():
+    engine = SanctionEngine()
+    get_log_stores()['incident'].subscribe(engine)
+    return engine
+
+def compute_sanctions():
+    load_incident_log()
+    return get_sanction_engine().sanctions()
+
+# Words too common in hostel notes to be worth indexing
+AFRIKAANS_STOPWORDS = frozenset("""
+    die n en het is was van na om in op te by met vir aan uit oor dat wat hy sy
+    hulle ons ek jy nie ook toe maar so as sal kan moes word le se
+""".split())
+DIMINUTIVE_SUFFIXES = ("tjies", "tjie", "jies", "jie", "pies", "pie", "kies", "kie")
+PLURAL_SUFFIXES = ("s", "e")  # stripped in turn, so "meisies" and "meisie" agree
+
+# Light Afrikaans stemming: drop a diminutive or plural ending and undouble
+# the final consonant, so "hekke", "hekkie" and "hek" index as the same word,
+# as do "kamers" and "kamer"
+def stem_term(term):
+    for suffix in DIMINUTIVE_SUFFIXES:
+        if term.endswith(suffix) and len(term) - len(suffix) >= 3:
+            term = term[:-len(suffix)]
+            break
+    for suffix in PLURAL_SUFFIXES:
+        if term.endswith(suffix) and len(term) - len(suffix) >= 3:
+            term = term[:-len(suffix)]
+    if len(term) > 3 and term[-1] == term[-2] and term[-1] not in "aeiou":
+        term = term[:-1]
+    return term
+
+# Accent-folded, stemmed search terms of a text ("'n" and other stopwords dropped)
+def search_terms(text):
+    return [stem_term(word) for word in re.findall(r"[a-z0-9]+", fold_text(text)) if word not in AFRIKAANS_STOPWORDS]
+
+# Inverted index over the free-text fields of one log, kept in step with its
+# store as a listener. Every row gets a document id in log order, so a row's
+# position is found by binary search over the ids even after clears.
+class TextIndex:
+    def __init__(self, fields):
+        self.fields = fields
+        self._lock = threading.Lock()
+        self._reset_state()
+
+    def _reset_state(self):
+        self._postings = {}   # term -> {doc id: term frequency}
+        self._doc_terms = {}  # doc id -> terms, to undo a document on clear
+        self._doc_ids = np.arange(0)
+        self._next_id = 0
+        self._vocabulary = None
+
+    def _text(self, rows):
+        text = pd.Series('', index=rows.index)
+        for field in self.fields:
+            text = text + ' ' + rows[field].astype(object).fillna('').astype(str)
+        return text
+
+    def _add(self, rows):
+        ids = np.arange(self._next_id, self._next_id + len(rows))
+        for doc, text in zip(ids, self._text(rows)):
+            terms = {}
+            for term in search_terms(text):
+                terms[term] = terms.get(term, 0) + 1
+            for term, count in terms.items():
+                if term not in self._postings:
+                    self._postings[term] = {}
+                    self._vocabulary = None
+                self._postings[term][int(doc)] = count
+            self._doc_terms[int(doc)] = tuple(terms)
+        self._doc_ids = np.concatenate([self._doc_ids, ids])
+        self._next_id += len(rows)
+
+    def reset(self, df):
+        with self._lock:
+            self._reset_state()
+            self._add(df)
+
+    def append(self, rows):
+        with self._lock:
+            self._add(rows)
+
+    def remove(self, rows):
+        with self._lock:
+            positions = rows.index.to_numpy()
+            for doc in self._doc_ids[positions]:
+                for term in self._doc_terms.pop(int(doc), ()):
+                    postings = self._postings[term]
+                    del postings[int(doc)]
+                    if not postings:
+                        del self._postings[term]
+                        self._vocabulary = None
+            self._doc_ids = np.delete(self._doc_ids, positions)
+
+    # Index terms starting with a (partly typed) last query word
+    def _expand(self, term):
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+        start = bisect_left(self._vocabulary, term)
+        matches = []
+        for candidate in self._vocabulary[start:]:
+            if not candidate.startswith(term):
+                break
+            matches.append(candidate)
+        return matches
+
+    # (row positions, scores) of rows containing every query term, best first.
+    # Scores are tf-idf; the last word also matches longer words it starts.
+    def search(self, terms):
+        with self._lock:
+            if not terms:
+                return np.arange(0), np.zeros(0)
+            total = max(len(self._doc_terms), 1)
+            scores = None
+            for i, term in enumerate(terms):
+                variants = self._expand(term) if i == len(terms) - 1 else [term]
+                term_scores = {}
+                for variant in variants:
+                    postings = self._postings.get(variant, {})
+                    idf = np.log(1 + total / max(len(postings), 1))
+                    for doc, count in postings.items():
+                        term_scores[doc] = term_scores.get(doc, 0) + count * idf
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {doc: score + term_scores[doc] for doc, score in scores.items() if doc in term_scores}
+                if not scores:
+                    break
+            docs = np.fromiter(scores, dtype=np.int64, count=len(scores))
+            values = np.fromiter(scores.values(), dtype=float, count=len(scores))
+            order = np.lexsort((docs, -values))
+            return np.searchsorted(self._doc_ids, docs[order]), values[order]
+
+SEARCH_FIELDS = {'incident': ['Incident', 'Comment'], 'happenings': ['Event', 'Comment']}
+
+@st.cache_resource
+def get_search_indexes():
+    indexes = {}
+    for name, store in get_log_stores().items():
+        indexes[name] = TextIndex(SEARCH_FIELDS[name])
+        store.subscribe(indexes[name])
+    return indexes
+
+# Ranked hits for a query over both logs. Filters apply to the hits only:
+# block (list, empty for all), incident category (happenings have none, so
+# they drop out when one is chosen) and an inclusive date range.
+def search_logs(query, blocks=(), category=None, start=None, end=None, limit=100):
+    terms = search_terms(query)
+    indexes = get_search_indexes()
+    frames = []
+    for name, store in get_log_stores().items():
+        if category is not None and name != 'incident':
+            continue
+        def ranked(df, index=indexes[name]):
+            positions, scores = index.search(terms)
+            hits = df.iloc[positions]
+            return hits.assign(Score=scores)
+        hits = store.with_frame(ranked)
+        if blocks:
+            hits = hits[hits['Block'].isin(blocks)]
+        if category is not None:
+            hits = hits[hits['Category'] == category]
+        if start is not None and end is not None:
+            hits = hits[hits['Date'].between(pd.Timestamp(start), pd.Timestamp(end))]
+        frames.append(pd.DataFrame({
+            'Log': 'Insident' if name == 'incident' else 'Gebeurtenis',
+            'Learner_Full_Name': hits['Learner_Full_Name'].astype(str),
+            'Block': hits['Block'].astype(str),
+            'Text': hits[SEARCH_FIELDS[name][0]].astype(str) + ': ' + hits['Comment'].astype(str),
+            'Date': hits['Date'],
+            'Score': hits['Score'],
+        }))
+    results = pd.concat(frames, ignore_index=True)
+    return results.sort_values('Score', ascending=False, kind='stable').head(limit).reset_index(drop=True)
+
+def log_versions():
+    return tuple(store.version for store in get_log_stores().values())
+
+# Learners in either log, sorted once per pair of log versions and shared
+# by all sessions (cache_resource: no per-call copy of the list)
+@st.cache_resource(max_entries=4, show_spinner=False)
+def learner_filter_options(versions):
+    stores = get_log_stores()
+    names = set(stores['incident'].learners()).union(stores['happenings'].learners())
+    return ('Kies',) + tuple(sorted(names))
+
+# Learners not on the roster (warned about; nothing is saved if any)
+def unknown_learners(learners):
+    roster_names = get_roster_options().name_set
+    return [learner for learner in learners if learner not in roster_names]
+
+# Save one incident for one or more learners: one row each, written in a
+# single append and pushed in a single sync
+def save_incident(learners, block, teacher, incident, category, comment):
+    if not all([learners, block != 'Kies', teacher != 'Kies', incident != 'Kies', category != 'Kies', comment]):
+        logger.warning("Incomplete incident fields, saving skipped.")
+        st.warning("Alle velde moet ingevul wees om die insident te stoor.")
+        return load_incident_log()
+    unknown = unknown_learners(learners)
+    if unknown:
+        logger.warning(f"Learners not on the roster, saving skipped: {unknown}")
+        st.warning(f"Nie op die leerderlys nie: {', '.join(unknown)}. Die insident is nie gestoor nie.")
+        return load_incident_log()
+        
+    sa_tz = pytz.timezone('Africa/Johannesburg')
+    count = len(learners)
+    new_incident = pd.DataFrame({
+        'Learner_Full_Name': list(learners),
+        'Block': [block] * count,
+        'Teacher': [teacher] * count,
+        'Incident': [incident] * count,
+        'Category': [category] * count,
+        'Comment': [comment] * count,
+        'Date': [datetime.now(sa_tz).date()] * count,
+        'Id': [new_entry_id() for _ in range(count)]
+    })
+    store = get_log_stores()['incident']
+    try:
+        store.append(new_incident)
+    except RemoteLogUnavailable as e:
+        logger.error(f"Saving skipped: {e}")
+        st.error(f"Kon nie die insident stoor nie: die log kon nie van GitHub gelaai word nie. Probeer weer oor 'n rukkie.")
+        return None
+    logger.info(f"Incident for {count} learner(s) saved locally to incident_log.csv")
+    incident_log = load_incident_log()
+
+    for path in store.written_paths(new_incident):
+        queue_github_sync(path, f"Updated {path} with new incident" + (f" for {count} learners" if count > 1 else ""))
+
+    return incident_log
+
+# Save one general happening for one or more learners in a single write
+def save_happening(learners, block, event, comment):
+    if not all([learners, block != 'Kies', event, comment]):
+        logger.warning("Incomplete happening fields, saving skipped.")
+        st.warning("Alle velde moet ingevul wees om die gebeurtenis te stoor.")
+        return load_happenings_log()
+    unknown = unknown_learners(learners)
+    if unknown:
+        logger.warning(f"Learners not on the roster, saving skipped: {unknown}")
+        st.warning(f"Nie op die leerderlys nie: {', '.join(unknown)}. Die gebeurtenis is nie gestoor nie.")
+        return load_happenings_log()
+        
+    sa_tz = pytz.timezone('Africa/Johannesburg')
+    count = len(learners)
+    new_happening = pd.DataFrame({
+        'Learner_Full_Name': list(learners),
+        'Block': [block] * count,
+        'Event': [event] * count,
+        'Comment': [comment] * count,
+        'Date': [datetime.now(sa_tz).date()] * count,
+        'Id': [new_entry_id() for _ in range(count)]
+    })
+    store = get_log_stores()['happenings']
+    try:
+        store.append(new_happening)
+    except RemoteLogUnavailable as e:
+        logger.error(f"Saving skipped: {e}")
+        st.error(f"Kon nie die gebeurtenis stoor nie: die log kon nie van GitHub gelaai word nie. Probeer weer oor 'n rukkie.")
+        return None
+    logger.info(f"Happening for {count} learner(s) saved locally to happenings_log.csv")
+    happenings_log = load_happenings_log()
+
+    for path in store.written_paths(new_happening):
+        queue_github_sync(path, f"Updated {path} with new happening" + (f" for {count} learners" if count > 1 else ""))
+
+    return happenings_log
+
+# Clear a single incident by its Id (a tombstone append); it can be undone
+# from this session for UNDO_SECONDS
+def clear_incident(entry_id, label=None):
+    store = get_log_stores()['incident']
+    removed = store.delete([entry_id])
+    if not removed.empty:
+        logger.info(f"Incident {entry_id} cleared locally")
+        for path in store.tombstone_paths():
+            queue_github_sync(path, f"Updated {path} after clearing incident")
+        st.session_state.last_cleared = {'log': 'incident', 'id': entry_id, 'at': time.time(), 'label': label or "Insident"}
+    else:
+        logger.warning(f"Incident {entry_id} not found for clearing")
+        st.warning("Hierdie insident is reeds verwyder.")
+    return store.get()
+
+# Clear a single happening by its Id
+def clear_happening(entry_id, label=None):
+    store = get_log_stores()['happenings']
+    removed = store.delete([entry_id])
+    if not removed.empty:
+        logger.info(f"Happening {entry_id} cleared locally")
+        for path in store.tombstone_paths():
+            queue_github_sync(path, f"Updated {path} after clearing happening")
+        st.session_state.last_cleared = {'log': 'happenings', 'id': entry_id, 'at': time.time(), 'label': label or "Gebeurtenis"}
+    else:
+        logger.warning(f"Happening {entry_id} not found for clearing")
+        st.warning("Hierdie gebeurtenis is reeds verwyder.")
+    return store.get()
+
+# Undo this session's last clear, if still inside the undo window
+def undo_last_clear():
+    cleared = st.session_state.pop('last_cleared', None)
+    if cleared is None:
+        return
+    store = get_log_stores()[cleared['log']]
+    if store.restore([cleared['id']]):
+        logger.info(f"Clear of {cleared['id']} undone")
+        for path in store.tombstone_paths():
+            queue_github_sync(path, f"Updated {path} after undoing a clear")
+    else:
+        st.warning("Die verwydering kan nie meer ontdoen word nie.")
+
+REPORT_CACHE_SIZE = 32
+
+# Content hash of a frame's columns and rows (the index is ignored)
+def _frame_fingerprint(df):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update("\x1f".join(map(str, df.columns)).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+# Generated .docx bytes, shared by all sessions
+@st.cache_resource
+def get_report_cache():
+    return LruCache(REPORT_CACHE_SIZE)
+
+# Rendered chart PNGs, shared by the report and dashboard paths
+@st.cache_resource
+def get_chart_cache():
+    return LruCache(CHART_CACHE_SIZE)
+
+TREND_FREQUENCIES = {'Weekliks': 'W-MON', 'Maandeliks': 'MS'}
+TREND_DIMENSIONS = {'Block': 'Blok', 'Category': 'Kategorie', 'Teacher': 'Toesighouer'}
+REPEAT_OFFENDER_MIN = 2   # incidents before a learner is listed as a repeat offender
+HEATMAP_LEARNERS = 20
+HEATMAP_WEEKS = 16
+
+# Incident counts over time for the trends dashboard: per week and month
+# (weeks start on Monday) for each block, category and supervisor, repeat
+# offenders, and a learner-by-week matrix for the most involved learners.
+# Built once per incident log version and shared by all sessions.
+class TrendRollups:
+    def __init__(self, df):
+        df = df.dropna(subset=['Date'])
+        self.empty = df.empty
+        self.counts = {}
+        if self.empty:
+            return
+        for label, freq in TREND_FREQUENCIES.items():
+            grouper = pd.Grouper(key='Date', freq=freq, label='left', closed='left')
+            periods = df.resample(freq, on='Date', label='left', closed='left').size().index
+            for col in TREND_DIMENSIONS:
+                counts = df.groupby([grouper, col], observed=True).size().unstack(fill_value=0)
+                self.counts[label, col] = counts.reindex(periods, fill_value=0)
+
+        week = df['Date'].dt.to_period('W-SUN').dt.start_time
+        by_learner = df.assign(Week=week).groupby('Learner_Full_Name', observed=True)
+        offenders = pd.DataFrame({
+            'Insidente': by_learner.size(),
+            'Weke': by_learner['Week'].nunique(),
+            'Laaste': by_learner['Date'].max(),
+        })
+        per_category = pd.crosstab(df['Learner_Full_Name'], df['Category']).add_prefix('Kategorie ')
+        offenders = offenders.join(per_category)
+        offenders = offenders[offenders['Insidente'] >= REPEAT_OFFENDER_MIN]
+        self.offenders = offenders.sort_values(['Insidente', 'Laaste'], ascending=False).rename_axis('Leerder').reset_index()
+
+        weeks = pd.date_range(end=week.max(), periods=HEATMAP_WEEKS, freq='7D')
+        recent = df[week >= weeks[0]].assign(Week=week)
+        matrix = recent.groupby(['Learner_Full_Name', 'Week'], observed=True).size().unstack(fill_value=0)
+        matrix = matrix.reindex(columns=weeks, fill_value=0)
+        top = matrix.sum(axis=1).sort_values(ascending=False, kind='stable').index[:HEATMAP_LEARNERS]
+        self.heatmap = matrix.loc[top]
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def trend_rollups(version):
+    return get_log_stores()['incident'].with_frame(TrendRollups)
+
+def _render_heatmap(matrix, title, dpi):
+    Figure, _, sns = load_charting()
+    fig = Figure(figsize=(max(6, 0.45 * matrix.shape[1] + 3), max(2.5, 0.3 * matrix.shape[0] + 1.2)))
+    ax = fig.subplots()
+    sns.heatmap(matrix, ax=ax, cmap='Reds', annot=True, fmt='d', cbar=False, linewidths=0.5,
+                xticklabels=[week.strftime('%d %b') for week in matrix.columns])
+    ax.set_title(title, pad=10, fontsize=12, weight='bold')
+    ax.set_xlabel('Week van', fontsize=10)
+    ax.set_ylabel('')
+    fig.tight_layout(pad=1.0)
+    img_stream = io.BytesIO()
+    fig.savefig(img_stream, format='png', dpi=dpi, bbox_inches='tight')
+    return img_stream.getvalue()
+
+# PNG heatmap of a learner-by-week matrix, rendered once per distinct matrix
+def heatmap_png(matrix, title, dpi=100, cache=None):
+    build = lambda: _render_heatmap(matrix, title, dpi)
+    if cache is None:
+        return build()
+    return cache.get_or_build(('heatmap', title, dpi, _frame_fingerprint(matrix.reset_index())), build)
+
+# Deferred download data for st.download_button: the report is built only when
+# the button is clicked, and served from cache if the same rows were reported before.
+def lazy_word_report(incident_df, happenings_df, learner_name=None):
+    cache = get_report_cache()
+    chart_cache = get_chart_cache()
+    def build():
+        key = (learner_name, _frame_fingerprint(incident_df), _frame_fingerprint(happenings_df))
+        return cache.get_or_build(key, lambda: generate_word_report(incident_df, happenings_df, learner_name, chart_cache).getvalue())
+    return build
+
+BULK_REPORT_WORKERS = os.cpu_count() or 1
+BULK_REPORT_BATCH = 10  # learners per task, so each task outweighs its pickling
+
+# Modules a report worker needs, imported once in the forkserver. Every
+# worker also imports the page module (hostel.py, as __mp_main__, which does
+# not render it); with hostel_app preloaded that costs only its own defs.
+REPORT_WORKER_PRELOAD = ['hostel_app', 'hostel_reports', 'docx', 'seaborn', 'matplotlib.figure']
+
+# Report workers are started by a forkserver (spawn where there is none), not
+# forked from this process: the server runs sync, poll and compaction
+# threads, and a fork could copy a lock one of them holds. The forkserver
+# imports the report libraries once, so each worker starts with them loaded.
+def _report_executor(workers):
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(REPORT_WORKER_PRELOAD)
+    else:
+        context = multiprocessing.get_context('spawn')
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+# Learners on the roster or in either log for a block ('Alle' for everyone)
+def bulk_report_learners(block):
+    names = set()
+    for df in (load_learner_data(), load_incident_log(), load_happenings_log()):
+        if block != 'Alle':
+            df = df[df['Block'] == block]
+        names.update(df['Learner_Full_Name'].astype(str))
+    names.discard('Onbekend2999')
+    return sorted(names)
+
+# Build each learner's report across the worker processes and write them into
+# one ZIP in `out` as they finish. Yields (done, total) after every batch.
+def build_bulk_reports(learners, out, workers=BULK_REPORT_WORKERS):
+    stores = get_log_stores()
+    batches = [
+        [(learner, stores['incident'].rows_for_learner(learner), stores['happenings'].rows_for_learner(learner))
+         for learner in learners[start:start + BULK_REPORT_BATCH]]
+        for start in range(0, len(learners), BULK_REPORT_BATCH)
+    ]
+    done = 0
+    # .docx files are already compressed
+    with zipfile.ZipFile(out, 'w', compression=zipfile.ZIP_STORED) as archive, _report_executor(workers) as pool:
+        futures = [pool.submit(learner_reports, batch) for batch in batches]
+        for future in as_completed(futures):
+            for learner, data in future.result():
+                archive.writestr(f"verslag_{learner.replace(' ', '_').replace('/', '-')}.docx", data)
+                done += 1
+            yield done, len(learners)
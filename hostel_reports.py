@@ -0,0 +1,200 @@
+# Word report generation for the hostel app. Kept out of hostel.py so the
+# bulk-report worker processes can import it without running the Streamlit
+# page; it imports neither streamlit nor the app module. python-docx and the
+# chart libraries are imported where they are first needed.
+import io
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from xml.sax.saxutils import escape
+
+import pandas as pd
+
+CHART_CACHE_SIZE = 64
+
+INCIDENT_HEADERS = {
+    'Learner_Full_Name': 'Leerder Naam',
+    'Block': 'Blok',
+    'Teacher': 'Toesighouer',
+    'Incident': 'Insident',
+    'Category': 'Kategorie',
+    'Comment': 'Kommentaar',
+    'Date': 'Datum'
+}
+HAPPENING_HEADERS = {
+    'Learner_Full_Name': 'Leerder Naam',
+    'Block': 'Blok',
+    'Event': 'Gebeurtenis',
+    'Comment': 'Kommentaar',
+    'Date': 'Datum'
+}
+
+# Cell texts for one report column, formatted for the whole column at once
+def _report_cell_texts(series, col):
+    if col == 'Date':
+        return pd.to_datetime(series, errors='coerce').dt.strftime("%Y-%m-%d").fillna('Onbekend2999').tolist()
+    return [str(value) for value in series.tolist()]
+
+# <w:r> for a cell's text, matching what python-docx's cell.text setter writes
+def _run_xml(text):
+    parts = []
+    for token in re.split(r'([\t\n\r])', text):
+        if token == '\t':
+            parts.append('<w:tab/>')
+        elif token in ('\n', '\r'):
+            parts.append('<w:br/>')
+        elif token:
+            space = ' xml:space="preserve"' if token.strip() != token else ''
+            parts.append(f'<w:t{space}>{escape(token)}</w:t>')
+    return '<w:r>' + ''.join(parts) + '</w:r>' if parts else '<w:r/>'
+
+# Add a 'Table Grid' table for df with a header row. The body is rendered to
+# WordprocessingML in one pass over the column arrays and appended with a
+# single parse, instead of python-docx add_row()/cell.text per cell, which
+# gets slower with every row already in the table.
+def add_bulk_table(doc, df, headers):
+    from docx.oxml import parse_xml
+    from docx.oxml.ns import nsdecls, qn
+    df = df[[col for col in headers if col in df.columns]]
+    table = doc.add_table(rows=1, cols=len(df.columns))
+    table.style = 'Table Grid'
+    for i, col in enumerate(df.columns):
+        table.cell(0, i).text = headers.get(col, col)
+    if df.empty:
+        return table
+    widths = [grid_col.get(qn('w:w')) for grid_col in table._tbl.tblGrid.gridCol_lst]
+    cell_open = [f'<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="{width}"/></w:tcPr><w:p>' for width in widths]
+    columns = [_report_cell_texts(df[col], col) for col in df.columns]
+    runs = {}
+    rows = []
+    for values in zip(*columns):
+        cells = []
+        for opening, text in zip(cell_open, values):
+            run = runs.get(text)
+            if run is None:
+                run = runs[text] = _run_xml(text)
+            cells.append(opening + run + '</w:p></w:tc>')
+        rows.append('<w:tr>' + ''.join(cells) + '</w:tr>')
+    body = parse_xml(f'<w:tbl {nsdecls("w")}>' + ''.join(rows) + '</w:tbl>')
+    table._tbl.extend(list(body))
+    return table
+
+# Bounded, thread-safe LRU for generated report and chart bytes
+class LruCache:
+    def __init__(self, maxsize):
+        self._maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get_or_build(self, key, build):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        data = build()
+        with self._lock:
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+        return data
+
+# Import the chart libraries and set the chart style, once per process
+@lru_cache(maxsize=None)
+def load_charting():
+    import matplotlib
+    import seaborn as sns
+    from matplotlib.figure import Figure
+    from matplotlib.ticker import MaxNLocator
+    # Set seaborn style for professional charts
+    sns.set_style("whitegrid")
+    matplotlib.rcParams['font.size'] = 10
+    matplotlib.rcParams['axes.titlesize'] = 12
+    matplotlib.rcParams['axes.labelsize'] = 10
+    matplotlib.rcParams['xtick.labelsize'] = 9
+    matplotlib.rcParams['ytick.labelsize'] = 9
+    return Figure, MaxNLocator, sns
+
+def _render_bar_chart(counts, title, xlabel, figsize, dpi, rotate_labels):
+    Figure, MaxNLocator, sns = load_charting()
+    # Figure rather than pyplot: reports may render off the script thread
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    sns.barplot(x=counts.index, y=counts.values, ax=ax, palette='Blues')
+    ax.set_title(title, pad=10, fontsize=12, weight='bold')
+    ax.set_xlabel(xlabel, fontsize=10)
+    ax.set_ylabel('Aantal', fontsize=10)
+    ax.yaxis.set_major_locator(MaxNLocator(integer=True))
+    if rotate_labels:
+        ax.tick_params(axis='x', rotation=45, labelsize=9)
+    fig.tight_layout(pad=1.0)
+    img_stream = io.BytesIO()
+    fig.savefig(img_stream, format='png', dpi=dpi, bbox_inches='tight')
+    return img_stream.getvalue()
+
+# PNG bar chart of value counts, rendered once per distinct counts/title/size
+def bar_chart_png(counts, title, xlabel, figsize=(4, 2.5), dpi=100, rotate_labels=False, cache=None):
+    build = lambda: _render_bar_chart(counts, title, xlabel, figsize, dpi, rotate_labels)
+    if cache is None:
+        return build()
+    key = (title, xlabel, figsize, dpi, rotate_labels, tuple(map(str, counts.index)), tuple(map(int, counts.values)))
+    return cache.get_or_build(key, build)
+
+# Generate Word document for incidents and happenings
+def generate_word_report(incident_df, happenings_df, learner_name=None, chart_cache=None):
+    from docx import Document
+    from docx.shared import Inches
+    doc = Document()
+    title = f'Hostel Verslag - {learner_name}' if learner_name else 'Hostel Verslag'
+    doc.add_heading(title, 0)
+
+    # Incidents Section
+    doc.add_heading('Insident Besonderhede', level=1)
+    if not incident_df.empty:
+        add_bulk_table(doc, incident_df, INCIDENT_HEADERS)
+    else:
+        doc.add_paragraph('Geen insidente gerapporteer nie.')
+
+    # General Happenings Section
+    doc.add_heading('Algemene Gebeurtenisse', level=1)
+    if not happenings_df.empty:
+        add_bulk_table(doc, happenings_df, HAPPENING_HEADERS)
+    else:
+        doc.add_paragraph('Geen algemene gebeurtenisse gerapporteer nie.')
+
+    # Analysis Section
+    doc.add_heading('Insident Analise', level=1)
+
+    # Bar chart: Incidents by Category
+    if not incident_df.empty:
+        # Count the values as plain strings: a Categorical would add zero bars
+        # for categories this report's rows do not use
+        category_counts = incident_df['Category'].astype(str).value_counts().sort_index()
+        png = bar_chart_png(category_counts, 'Insidente volgens Kategorie', 'Kategorie', cache=chart_cache)
+        doc.add_picture(io.BytesIO(png), width=Inches(3.5))
+
+        # Bar chart: Incidents by Block
+        if 'Block' in incident_df.columns:
+            block_counts = incident_df['Block'].astype(str).value_counts()
+            png = bar_chart_png(block_counts, 'Insidente volgens Blok', 'Blok', rotate_labels=True, cache=chart_cache)
+            doc.add_picture(io.BytesIO(png), width=Inches(3.5))
+        else:
+            doc.add_paragraph('Geen Blok-data beskikbaar vir analise nie.')
+    else:
+        doc.add_paragraph('Geen insident-data beskikbaar vir analise nie.')
+
+    doc_stream = io.BytesIO()
+    doc.save(doc_stream)
+    doc_stream.seek(0)
+    return doc_stream
+
+# Word reports for one batch of learners; the function the bulk-report
+# worker processes run:
+# [(learner, incident rows, happening rows)] -> [(learner, .docx bytes)]
+def learner_reports(batch):
+    chart_cache = LruCache(CHART_CACHE_SIZE)
+    return [
+        (learner, generate_word_report(incidents, happenings, learner, chart_cache).getvalue())
+        for learner, incidents, happenings in batch
+    ]
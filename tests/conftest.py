@@ -0,0 +1,48 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hostel_app  # noqa: E402
+
+# The app module, run in an empty directory with no GitHub repository
+# configured and none of the previous test's cached resources
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("GITHUB_TOKEN", raising=False)
+    monkeypatch.setenv("STORAGE_BACKEND", "csv")
+    hostel_app.st.cache_resource.clear()
+    yield hostel_app
+    hostel_app.st.cache_resource.clear()
+
+# New incident rows, one per learner, each with a fresh Id
+@pytest.fixture
+def incidents(app):
+    def make(*learners, date="2026-10-01", comment="Laat by studiesaal"):
+        count = len(learners)
+        return pd.DataFrame({
+            'Learner_Full_Name': list(learners),
+            'Block': ['A ASSEGAAI'] * count,
+            'Teacher': ['D GROENEWALD'] * count,
+            'Incident': ['Laat by studiesaal(Oggend)'] * count,
+            'Category': ['1'] * count,
+            'Comment': [comment] * count,
+            'Date': [pd.Timestamp(date)] * count,
+            'Id': [app.new_entry_id() for _ in range(count)],
+        })
+    return make
+
+# Incident log store for a backend, on the files in the test's directory
+@pytest.fixture
+def log_store(app):
+    def make(backend):
+        if backend == "sqlite":
+            return app.SqliteLogStore("hostel.db", "incidents", "incident_log.csv", app.INCIDENT_COLUMNS, app.read_incident_log, app.normalize_incident_log)
+        if backend == "partitioned":
+            return app.PartitionedLogStore("incident_log.csv", app.INCIDENT_COLUMNS, app.read_incident_log, app.normalize_incident_log)
+        return app.CsvLogStore("incident_log.csv", app.INCIDENT_COLUMNS, app.read_incident_log, app.normalize_incident_log)
+    return make
@@ -0,0 +1,198 @@
+import gzip
+import hashlib
+import io
+import time
+
+import pandas as pd
+import pytest
+from github import GithubException
+
+BACKENDS = ["csv", "sqlite", "partitioned"]
+
+class Blob:
+    def __init__(self, path, content):
+        self.path = path
+        self.type = "file"
+        self.decoded_content = content
+        self.sha = hashlib.sha1(content).hexdigest()
+
+class Requester:
+    rate_limiting = (5000, 5000)
+    rate_limiting_resettime = 0
+
+class FakeGithub:
+    requester = Requester()
+
+# In-memory repository with GitHub's SHA checks: an update must name the
+# blob it replaces (409 otherwise) and a create must not find a file (422)
+class FakeRepo:
+    def __init__(self):
+        self.files = {}
+        self.calls = []
+
+    def get_contents(self, path, ref):
+        if path not in self.files:
+            raise GithubException(404, {}, {})
+        return self.files[path]
+
+    def create_file(self, path, message, content, branch):
+        self.calls.append(('create', path))
+        if path in self.files:
+            raise GithubException(422, {}, {})
+        self.files[path] = Blob(path, content)
+        return {"content": self.files[path]}
+
+    def update_file(self, path, message, content, sha, branch):
+        self.calls.append(('update', path))
+        if path not in self.files:
+            raise GithubException(404, {}, {})
+        if self.files[path].sha != sha:
+            raise GithubException(409, {}, {})
+        self.files[path] = Blob(path, content)
+        return {"content": self.files[path]}
+
+    # Another app instance pushing its copy of a log
+    def push(self, path, df):
+        content = df.to_csv(index=False).encode('utf-8')
+        self.files[path] = Blob(path, gzip.compress(content) if path.endswith(".gz") else content)
+
+    def read(self, path):
+        content = self.files[path].decoded_content
+        return pd.read_csv(io.BytesIO(gzip.decompress(content) if path.endswith(".gz") else content), dtype={'Id': str}, parse_dates=['Date'])
+
+@pytest.fixture
+def repo():
+    return FakeRepo()
+
+@pytest.fixture
+def client(app, repo):
+    client = app.GithubRepoClient("token")
+    client._github = FakeGithub()
+    client._repo = repo
+    return client
+
+def sync_worker(app, client, store):
+    exporters = {store.path: store.export_csv} if hasattr(store, 'export_csv') else {}
+    return app.GithubSyncWorker(client, outbox_path="outbox.json", exporters=exporters, stores=[store])
+
+def tombstones(*records):
+    return "Id,Action,At\n" + "".join(f"{entry_id},{action},{at}\n" for entry_id, action, at in records)
+
+def ids(store):
+    return store.get()['Id'].tolist()
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_merged_tombstones_apply_in_time_order(log_store, incidents, backend):
+    store = log_store(backend)
+    rows = incidents("LEERDER Een", "LEERDER Twee")
+    store.append(rows)
+    entry = rows['Id'][0]
+    path = store.tombstone_paths()[0]
+    now = time.time()
+    # The undo reached GitHub before the clear it undoes
+    assert store.merge_remote(path, tombstones((entry, 'restore', now + 2), (entry, 'delete', now + 1))) == 2
+    assert ids(store) == rows['Id'].tolist()
+    assert store.merge_remote(path, tombstones((entry, 'delete', now + 3), (entry, 'restore', now + 2))) == 1
+    assert ids(store) == [rows['Id'][1]]
+    assert store.merge_remote(path, tombstones((entry, 'delete', now + 3))) == 0
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_merge_adds_only_entries_new_here(log_store, incidents, backend):
+    store = log_store(backend)
+    local = incidents("LEERDER Een")
+    store.append(local)
+    remote = pd.concat([local, incidents("LEERDER Twee")], ignore_index=True)
+    text = remote.to_csv(index=False)
+    assert store.merge_remote(store.remote_paths()[0], text) == 1
+    assert ids(store) == remote['Id'].tolist()
+    assert store.merge_remote(store.remote_paths()[0], text) == 0
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_stale_remote_copies_cannot_bring_back_compacted_entries(log_store, incidents, backend):
+    store = log_store(backend)
+    rows = incidents("LEERDER Een", "LEERDER Twee")
+    store.append(rows)
+    cleared = rows['Id'][0]
+    store.delete([cleared])
+    tombstone_path = store.tombstone_paths()[0]
+    with open(tombstone_path) as f:
+        stale_tombstones = f.read()
+    stale_log = rows.to_csv(index=False)
+    store.compact(time.time() + 1)
+    assert store.merge_remote(store.remote_paths()[0], stale_log) == 0
+    assert store.merge_remote(tombstone_path, stale_tombstones) == 0
+    assert store.merge_remote(tombstone_path, tombstones((cleared, 'restore', time.time()))) == 0
+    assert ids(store) == [rows['Id'][1]]
+    assert cleared not in store._read()['Id'].tolist()
+
+def test_put_file_over_a_stale_sha_raises_a_conflict(app, client, repo):
+    repo.files["log.csv"] = Blob("log.csv", b"Id\nother\n")
+    with pytest.raises(app.PushConflict):
+        client.put_file("log.csv", b"Id\nmine\n", "save", "stale-sha")
+    assert repo.files["log.csv"].decoded_content == b"Id\nother\n"
+    client.put_file("log.csv", b"Id\nmine\n", "save", repo.files["log.csv"].sha)
+    assert repo.files["log.csv"].decoded_content == b"Id\nmine\n"
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_push_conflict_merges_the_remote_copy_before_pushing_again(app, log_store, incidents, client, repo, backend):
+    store = log_store(backend)
+    worker = sync_worker(app, client, store)
+    first = incidents("LEERDER Een")
+    store.append(first)
+    path = store.written_paths(first)[0]
+    worker._push_file(path, "save")
+    # Another instance pushes an entry of its own, then this one saves
+    theirs = incidents("LEERDER Twee")
+    repo.push(path, pd.concat([repo.read(path), theirs], ignore_index=True))
+    mine = incidents("LEERDER Drie")
+    store.append(mine)
+    worker._push_file(path, "save")
+    assert [call for call, _ in repo.calls] == ['create', 'update', 'update']
+    remote = repo.read(path)['Id'].tolist()
+    assert sorted(remote) == sorted([first['Id'][0], theirs['Id'][0], mine['Id'][0]])
+    assert theirs['Id'][0] in ids(store)
+
+def test_push_gives_up_while_the_remote_keeps_changing(app, log_store, incidents, client, repo, monkeypatch):
+    store = log_store("csv")
+    worker = sync_worker(app, client, store)
+    store.append(incidents("LEERDER Een"))
+    repo.push(store.path, pd.DataFrame(columns=app.INCIDENT_COLUMNS))
+    pushes = iter(range(100))
+
+    def update_file(path, message, content, sha, branch):
+        repo.push(path, incidents(f"LEERDER {next(pushes)}"))
+        raise GithubException(409, {}, {})
+
+    monkeypatch.setattr(repo, "update_file", update_file)
+    with pytest.raises(app.PushConflict):
+        worker._push_file(store.path, "save")
+    assert next(pushes) == app.SYNC_CONFLICT_RETRIES
+
+# Stands in for the client in the change poller: serves one remote text
+class PollClient:
+    configured = True
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.remembered = {}
+
+    def poll_file(self, path, etag=None):
+        text = self.texts.get(path)
+        return f"etag-{path}", f"sha-{path}", text
+
+    def remember_sha(self, path, sha):
+        self.remembered[path] = sha
+
+def test_poller_merges_remote_changes_and_remembers_their_sha(app, log_store, incidents):
+    store = log_store("csv")
+    local = incidents("LEERDER Een")
+    store.append(local)
+    remote = pd.concat([local, incidents("LEERDER Twee")], ignore_index=True)
+    client = PollClient({store.path: remote.to_csv(index=False)})
+    poller = app.RemoteChangePoller(client, [store], interval=3600)
+    version = store.version
+    poller.poll_once()
+    assert poller.last_error is None
+    assert ids(store) == remote['Id'].tolist()
+    assert store.version > version
+    assert client.remembered == {store.path: f"sha-{store.path}"}
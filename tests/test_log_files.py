@@ -0,0 +1,77 @@
+import multiprocessing
+import os
+
+import pandas as pd
+import pytest
+
+import hostel_app
+
+COLUMNS = ['Id', 'Learner_Full_Name', 'Comment']
+APPENDS_PER_WRITER = 25
+
+def _read(path):
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+# One writer process: appends its rows one save at a time, as the app does
+def _append_rows(path, writer):
+    for i in range(APPENDS_PER_WRITER):
+        rows = pd.DataFrame({'Id': [f"{writer}-{i}"], 'Learner_Full_Name': [f"LEERDER {writer}"], 'Comment': ["Kommentaar, met 'n komma"]})
+        with hostel_app.locked_log(path):
+            hostel_app.append_log_rows(path, rows, COLUMNS, lambda: _read(path))
+
+def test_concurrent_appends_under_the_lock_keep_every_row(tmp_path):
+    if hostel_app.fcntl is None:
+        pytest.skip("no advisory file locks on this platform")
+    path = str(tmp_path / "log.csv")
+    context = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn")
+    writers = [context.Process(target=_append_rows, args=(path, writer)) for writer in range(4)]
+    for process in writers:
+        process.start()
+    for process in writers:
+        process.join(60)
+        assert process.exitcode == 0
+    df = _read(path)
+    assert list(df.columns) == COLUMNS
+    assert sorted(df['Id']) == sorted(f"{writer}-{i}" for writer in range(4) for i in range(APPENDS_PER_WRITER))
+    assert (df['Comment'] == "Kommentaar, met 'n komma").all()
+
+def test_append_writes_only_the_new_lines(tmp_path):
+    path = str(tmp_path / "log.csv")
+    first = pd.DataFrame({'Id': ['a'], 'Learner_Full_Name': ['EEN'], 'Comment': ['x']})
+    with hostel_app.locked_log(path):
+        hostel_app.append_log_rows(path, first, COLUMNS, lambda: _read(path))
+    inode = os.stat(path).st_ino
+    second = pd.DataFrame({'Id': ['b'], 'Learner_Full_Name': ['TWEE'], 'Comment': ['y']})
+    with hostel_app.locked_log(path):
+        hostel_app.append_log_rows(path, second, COLUMNS, lambda: pytest.fail("an append must not reread the log"))
+    assert os.stat(path).st_ino == inode
+    assert _read(path)['Id'].tolist() == ['a', 'b']
+
+def test_append_ends_an_unterminated_last_line(tmp_path):
+    path = tmp_path / "log.csv"
+    path.write_text("Id,Learner_Full_Name,Comment\na,EEN,x")
+    rows = pd.DataFrame({'Id': ['b'], 'Learner_Full_Name': ['TWEE'], 'Comment': ['y']})
+    with hostel_app.locked_log(str(path)):
+        hostel_app.append_log_rows(str(path), rows, COLUMNS, lambda: _read(str(path)))
+    assert _read(str(path))['Id'].tolist() == ['a', 'b']
+
+def test_append_rewrites_a_log_with_other_headings(tmp_path):
+    path = tmp_path / "log.csv"
+    path.write_text("Leerder Naam,Kommentaar\nEEN,x\n")
+    loader = lambda: _read(str(path)).rename(columns={'Leerder Naam': 'Learner_Full_Name', 'Kommentaar': 'Comment'}).assign(Id='legacy')[COLUMNS]
+    rows = pd.DataFrame({'Id': ['b'], 'Learner_Full_Name': ['TWEE'], 'Comment': ['y']})
+    with hostel_app.locked_log(str(path)):
+        hostel_app.append_log_rows(str(path), rows, COLUMNS, loader)
+    df = _read(str(path))
+    assert list(df.columns) == COLUMNS
+    assert df['Id'].tolist() == ['legacy', 'b']
+
+def test_log_store_append_is_seen_by_another_process_store(app, incidents):
+    store = app.CsvLogStore("incident_log.csv", app.INCIDENT_COLUMNS, app.read_incident_log, app.normalize_incident_log)
+    rows = incidents("LEERDER Een", "LEERDER Twee")
+    store.append(rows)
+    other = app.CsvLogStore("incident_log.csv", app.INCIDENT_COLUMNS, app.read_incident_log, app.normalize_incident_log)
+    assert other.get()['Id'].tolist() == rows['Id'].tolist()
+    more = incidents("LEERDER Drie")
+    other.append(more)
+    assert store.get()['Id'].tolist() == rows['Id'].tolist() + more['Id'].tolist()
@@ -0,0 +1,126 @@
+import time
+
+import pytest
+
+BACKENDS = ["csv", "sqlite", "partitioned"]
+
+# The store, and a second one on the same files standing in for another
+# process of the app
+@pytest.fixture(params=BACKENDS)
+def stores(request, log_store):
+    return log_store(request.param), log_store(request.param)
+
+# Records the listener calls a store makes
+class Recorder:
+    def __init__(self):
+        self.events = []
+
+    def reset(self, df):
+        self.events.append(('reset', df['Id'].tolist()))
+
+    def append(self, rows):
+        self.events.append(('append', rows['Id'].tolist()))
+
+    def remove(self, rows):
+        self.events.append(('remove', rows['Id'].tolist()))
+
+def ids(store):
+    return store.get()['Id'].tolist()
+
+# Every entry the backend still stores, cleared ones included
+def stored_ids(store):
+    return store._read()['Id'].tolist()
+
+def test_clear_hides_the_entry_in_every_process(stores, incidents):
+    store, other = stores
+    rows = incidents("LEERDER Een", "LEERDER Twee", "LEERDER Drie")
+    store.append(rows)
+    first, middle, last = rows['Id']
+    removed = store.delete([middle])
+    assert removed['Id'].tolist() == [middle]
+    assert ids(store) == [first, last]
+    assert ids(other) == [first, last]
+    # Cleared entries stay stored until compaction
+    assert middle in stored_ids(store)
+    assert store.delete([middle]).empty
+
+def test_undo_puts_the_entry_back_in_its_place(stores, incidents):
+    store, other = stores
+    rows = incidents("LEERDER Een", "LEERDER Twee", "LEERDER Drie")
+    store.append(rows)
+    store.delete([rows['Id'][1]])
+    assert ids(other) == [rows['Id'][0], rows['Id'][2]]
+    assert store.restore([rows['Id'][1]]) == [rows['Id'][1]]
+    assert ids(store) == rows['Id'].tolist()
+    assert ids(other) == rows['Id'].tolist()
+    assert store.restore([rows['Id'][1]]) == []
+
+def test_undo_is_refused_after_the_window(app, stores, incidents, monkeypatch):
+    store, _ = stores
+    rows = incidents("LEERDER Een")
+    store.append(rows)
+    store.delete(rows['Id'])
+    monkeypatch.setattr(app, "UNDO_SECONDS", 0)
+    time.sleep(0.01)
+    assert store.restore(rows['Id']) == []
+    assert ids(store) == []
+
+def test_compaction_waits_for_the_undo_window(app, stores, incidents):
+    store, _ = stores
+    rows = incidents("LEERDER Een", "LEERDER Twee")
+    store.append(rows)
+    store.delete([rows['Id'][0]])
+    assert store.compact(time.time() - app.UNDO_SECONDS) == []
+    assert rows['Id'][0] in stored_ids(store)
+
+def test_compaction_drops_cleared_entries_for_good(stores, incidents):
+    store, other = stores
+    rows = incidents("LEERDER Een", "LEERDER Twee", "LEERDER Drie")
+    store.append(rows)
+    cleared = rows['Id'][1]
+    store.delete([cleared])
+    written = store.compact(time.time() + 1)
+    assert store.tombstone_paths()[0] in written
+    assert cleared not in stored_ids(store)
+    assert ids(store) == [rows['Id'][0], rows['Id'][2]]
+    assert ids(other) == [rows['Id'][0], rows['Id'][2]]
+    assert store.restore([cleared]) == []
+    assert store.compact(time.time() + 1) == []
+
+def test_listeners_follow_saves_clears_and_undos(stores, incidents):
+    store, _ = stores
+    rows = incidents("LEERDER Een", "LEERDER Twee")
+    store.append(rows.iloc[:1])
+    recorder = Recorder()
+    store.subscribe(recorder)
+    store.get()
+    store.append(rows.iloc[1:])
+    store.delete([rows['Id'][0]])
+    store.restore([rows['Id'][0]])
+    store.get()
+    assert recorder.events == [
+        ('reset', [rows['Id'][0]]),
+        ('append', [rows['Id'][1]]),
+        ('remove', [rows['Id'][0]]),
+        ('reset', rows['Id'].tolist()),
+    ]
+
+def test_learner_index_follows_clears(stores, incidents):
+    store, _ = stores
+    rows = incidents("LEERDER Een", "LEERDER Twee", "LEERDER Een")
+    store.append(rows)
+    assert store.rows_for_learner("LEERDER Een")['Id'].tolist() == [rows['Id'][0], rows['Id'][2]]
+    store.delete([rows['Id'][0]])
+    assert store.rows_for_learner("LEERDER Een")['Id'].tolist() == [rows['Id'][2]]
+    store.delete([rows['Id'][2]])
+    assert store.learners() == ("LEERDER Twee",)
+
+def test_date_lookups_leave_out_cleared_entries(stores, incidents):
+    store, _ = stores
+    first = incidents("LEERDER Een", date="2026-09-30")
+    second = incidents("LEERDER Twee", "LEERDER Drie", date="2026-10-01")
+    store.append(first)
+    store.append(second)
+    store.delete([second['Id'][0]])
+    assert store.rows_on_date("2026-10-01")['Id'].tolist() == [second['Id'][1]]
+    assert store.rows_between("2026-09-01", "2026-10-31")['Id'].tolist() == [first['Id'][0], second['Id'][1]]